@@ -0,0 +1,38 @@
+"""Import a ZIP archive or a directory of PDF/DOCX CVs for one job description.
+
+    python -m app.bulk_import cvs.zip --job-id 3 --username-prefix fair2025-
+"""
+import argparse
+import json
+import sys
+from app.utils import extraction, storage
+from app.utils.bulk_import import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_WORKERS, import_cvs
+from app.utils.faiss_index import cv_index
+from app.utils.object_storage import uploader
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="ZIP file or directory")
+    parser.add_argument("--job-id", type=int, required=True)
+    parser.add_argument("--username-prefix", default="", help="prepended to the username derived from each file name")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    storage.init_db()
+    try:
+        report = import_cvs(args.source, args.job_id, args.username_prefix, args.workers, args.batch_size)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        cv_index.save()
+        uploader.close()
+        extraction.shutdown()
+
+    for failure in report["failed"]:
+        print(json.dumps(failure), file=sys.stderr)
+    print(f"Imported {len(report['imported'])} CVs, {len(report['failed'])} failed")
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
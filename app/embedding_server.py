@@ -0,0 +1,37 @@
+import os
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from app.utils.embeddings import MODEL_NAME, encode_vectors, load_model
+
+# Run one per node and point the API workers at it with EMBEDDING_BACKEND=remote:
+#   uvicorn app.embedding_server:app --port 8001
+SERVER_BACKEND = os.getenv("EMBEDDING_SERVER_BACKEND", "torch")
+MAX_TEXTS_PER_REQUEST = int(os.getenv("EMBEDDING_SERVER_MAX_TEXTS", "512"))
+
+app = FastAPI()
+model = None
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+
+@app.on_event("startup")
+async def load_embeddings_model():
+    global model
+    if SERVER_BACKEND == "remote":
+        raise ValueError("The embedding server needs a local backend")
+    model = load_model(SERVER_BACKEND)
+    model.embed_query("warm up")
+
+@app.get("/info")
+async def info():
+    return {"model_id": f"{MODEL_NAME}@{SERVER_BACKEND}"}
+
+@app.post("/embed")
+def embed(request: EmbedRequest):
+    # A plain def runs in the threadpool, so concurrent batches don't block the event loop
+    if len(request.texts) > MAX_TEXTS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_TEXTS_PER_REQUEST} texts per request")
+    if not request.texts:
+        return encode_vectors(np.zeros((0, 0), dtype=np.float32))
+    return encode_vectors(np.array(model.embed_documents(request.texts), dtype=np.float32))
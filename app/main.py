@@ -1,16 +1,38 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import json
+from sqlalchemy.exc import IntegrityError
+import logging
 import os
+import threading
+import time
 from app.models.user import User, UserInDB
-from app.utils.auth import hash_password, verify_password, create_access_token, decode_access_token
-from app.utils.cloudinary_config import upload_file
-from app.utils.rag_model import compute_relevance_score, generate_feedback
-import PyPDF2
-from docx import Document
-import io
+from app.utils import storage
+from app.utils.auth import hash_password_async, verify_password_async, create_access_token, decode_access_token
+from app.utils.rag_model import embed_texts, similarity_to_score
+from app.utils.embeddings import warm_up
+from app.utils.cache import get_evaluation, get_job_embedding, invalidate_job, job_hash
+from app.utils.cv_parser import structure_cv_content
+from app.utils.matchers import normalize_skills
+from app.utils.object_storage import OBJECT_STORAGE_BACKEND, OBJECT_STORAGE_DIR, uploader
+from app.utils.lexical_index import sync_lexical_index
+from app.utils.scoring import build_job_text, score_cvs, shortlist_cvs
+from app.utils.rescoring import RESCORE_ENABLED, build_evaluation, evaluate_cvs, scheduler as rescoring_scheduler
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, ndjson_lines, parse_fields
+from app.utils.extraction import MAX_CV_BYTES
+from app.utils.ingestion import IngestionQueueFull, submit_ingestion, shutdown as shutdown_ingestion
+from app.utils.vector_store import compact_stored_cv_vectors, get_cv_vectors, start_compaction, stop_compaction
+from app.utils.bulk_import import import_cvs
+from app.utils.faiss_index import cv_index, job_index, sync_cv_index, sync_job_index
+from app.utils.metrics import http_request_seconds, render as render_metrics
+from app.utils.profiling import profile_request, should_profile
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -20,13 +42,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-USERS_FILE = "users.json"
-JOB_FILE = "job_descriptions.json"
-CV_FILE = "cvs.json"
-EVALUATION_FILE = "evaluations.json"
+# Upper bound on k for the FAISS reverse searches
+MAX_SEARCH_RESULTS = 100
+
+if OBJECT_STORAGE_BACKEND == "local":
+    os.makedirs(OBJECT_STORAGE_DIR, exist_ok=True)
+    app.mount("/files", StaticFiles(directory=OBJECT_STORAGE_DIR), name="files")
+
+storage.init_db()
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        if should_profile(request):
+            response = await profile_request(request, call_next)
+        else:
+            response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template so /api/cvs/1 and /api/cvs/2 share a series
+        route = request.scope.get("route")
+        http_request_seconds.observe(time.perf_counter() - start, request.method, route.path if route else "unmatched", status_code)
+
+@app.on_event("startup")
+async def warm_up_embeddings():
+    # Load the model before the first request rather than during it
+    warm_up()
+
+def _sync_vector_indexes():
+    # Index anything added while the process was down or before the last flush
+    try:
+        jobs = sync_job_index()
+        sync_lexical_index()
+        compact_stored_cv_vectors()
+        logger.info("Vector indexes synced: %d jobs and %d CVs backfilled", jobs, sync_cv_index())
+    except Exception:
+        logger.exception("Vector index sync failed")
+
+@app.on_event("startup")
+async def sync_vector_indexes():
+    # Runs behind the first requests so a large backlog doesn't hold up startup; until it
+    # finishes, searches just miss the CVs and jobs it hasn't backfilled yet
+    threading.Thread(target=_sync_vector_indexes, name="index-sync", daemon=True).start()
+    # Rows of deleted or replaced CVs keep piling up in a long-running server, so check again periodically
+    start_compaction()
+
+@app.on_event("startup")
+async def start_rescoring():
+    # Picks up evaluations left stale by a model change or by job edits made while the process was down
+    if RESCORE_ENABLED:
+        rescoring_scheduler.start()
+
+@app.on_event("shutdown")
+async def save_vector_indexes():
+    rescoring_scheduler.stop()
+    stop_compaction()
+    shutdown_ingestion()
+    uploader.close()
+    cv_index.save()
+    job_index.save()
 
 class JobDescription(BaseModel):
     jobTitle: str
@@ -34,87 +115,32 @@ class JobDescription(BaseModel):
     experience: str
     traits: str | None
 
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
-
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     return decode_access_token(token)
 
-def extract_text_from_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def extract_text_from_docx(file):
-    doc = Document(file)
-    text = ""
-    for para in doc.paragraphs:
-        text += para.text + "\n"
-    return text
-
-def structure_cv_content(text):
-    sections = {"education": [], "experience": [], "skills": [], "positions_of_responsibility": []}
-    lines = text.split('\n')
-    current_section = None
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in ["education", "academic", "qualification"]):
-            current_section = "education"
-        elif any(keyword in line_lower for keyword in ["experience", "work history", "employment", "projects"]):
-            current_section = "experience"
-        elif any(keyword in line_lower for keyword in ["skills", "technical skills", "abilities", "competencies"]):
-            current_section = "skills"
-        elif any(keyword in line_lower for keyword in ["positions of responsibility"]):
-            current_section = "positions_of_responsibility"
-        elif any(keyword in line_lower for keyword in ["achievements", "courses taken"]):
-            current_section = None
-        elif current_section:
-            sections[current_section].append(line)
-        else:
-            if any(keyword in line_lower for keyword in ["university", "degree", "b.tech", "m.tech", "phd"]):
-                sections["education"].append(line)
-            elif any(keyword in line_lower for keyword in ["years", "worked at", "internship", "engineer", "developer"]):
-                sections["experience"].append(line)
-            elif any(keyword in line_lower for keyword in ["python", "javascript", "java", "sql", "leadership", "teamwork"]):
-                sections["skills"].append(line)
-
-    return sections
-
 @app.get("/")
 async def root():
     return {"message": "CvAlign API is running!"}
 
 @app.post("/register")
 async def register(user: User):
-    users = load_users()
-    if any(u["username"] == user.username for u in users):
+    if storage.get_user(user.username):
         raise HTTPException(status_code=400, detail="Username already exists")
     if user.role not in ["recruiter", "hiring_manager", "admin", "job_seeker"]:
         raise HTTPException(status_code=400, detail="Invalid role")
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     user_data = {"username": user.username, "hashed_password": hashed_password, "role": user.role}
-    users.append(user_data)
-    save_users(users)
+    try:
+        storage.add_user(user_data)
+    except IntegrityError:
+        # Another request registered the same username while the password was being hashed
+        raise HTTPException(status_code=400, detail="Username already exists")
     return {"message": "User registered successfully"}
 
 @app.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    users = load_users()
-    user = next((u for u in users if u["username"] == form_data.username), None)
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    user = storage.get_user(form_data.username)
+    if not user or not await verify_password_async(form_data.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     access_token = create_access_token(data={"sub": user["username"], "role": user["role"]})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -122,13 +148,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 @app.get("/api/job-descriptions")
 async def get_job_descriptions(current_user: dict = Depends(get_current_user)):
     try:
-        if not os.path.exists(JOB_FILE):
-            return []
-        with open(JOB_FILE, 'r') as f:
-            jobs = json.load(f)
         if current_user["role"] in ["recruiter", "hiring_manager"]:
-            jobs = [job for job in jobs if job.get("created_by") == current_user["username"]]
-        return [{"id": idx, **job} for idx, job in enumerate(jobs)]
+            return storage.list_jobs(created_by=current_user["username"])
+        return storage.list_jobs()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching job descriptions: {str(e)}")
 
@@ -137,83 +159,127 @@ async def save_job_description(job: JobDescription, current_user: dict = Depends
     if current_user["role"] not in ["hiring_manager", "admin", "recruiter"]:
         raise HTTPException(status_code=403, detail="Not authorized to create job descriptions")
     try:
-        if os.path.exists(JOB_FILE):
-            with open(JOB_FILE, 'r') as f:
-                jobs = json.load(f)
-        else:
-            jobs = []
         if current_user["role"] == "recruiter":
-            existing_jobs = [j for j in jobs if j.get("created_by") == current_user["username"]]
-            if existing_jobs:
+            if storage.get_job_ids(current_user["username"]):
                 raise HTTPException(status_code=400, detail="Recruiters can only create one job description")
         job_data = job.dict()
         job_data["created_by"] = current_user["username"]
-        jobs.append(job_data)
-        with open(JOB_FILE, 'w') as f:
-            json.dump(jobs, f, indent=2)
+        job_data["skill_set"] = normalize_skills(job.skills)
+        job_id = storage.add_job(job_data)
+        vectors = await run_in_threadpool(embed_texts, [build_job_text(job_data)])
+        job_index.add([job_id], vectors, [job_hash(job_data)])
         return {"message": "Job description saved successfully"}
     except Exception as e:
-        print(f"Error saving job description: {e}")
+        logger.exception("Error saving job description")
         return {"message": f"Error saving job description: {str(e)}"}
 
-@app.post("/api/upload-cv")
+@app.put("/api/job-description/{job_id}")
+async def update_job_description(job_id: int, job: JobDescription, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["hiring_manager", "admin", "recruiter"]:
+        raise HTTPException(status_code=403, detail="Not authorized to edit job descriptions")
+    existing = storage.get_job(job_id)
+    if existing is None:
+        raise HTTPException(status_code=404, detail="Job description not found")
+    if current_user["role"] != "admin" and existing["created_by"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="You can only edit your own job descriptions")
+    try:
+        job_data = job.dict()
+        job_data["skill_set"] = normalize_skills(job.skills)
+        storage.update_job(job_id, job_data)
+        vectors = await run_in_threadpool(embed_texts, [build_job_text(job_data)])
+        job_index.replace([job_id], vectors, [job_hash(job_data)])
+        # Existing evaluations of this job are now stale; re-score them in the background
+        invalidate_job(job_id)
+        rescoring_scheduler.trigger()
+        return {"message": "Job description updated successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating job description: {str(e)}")
+
+@app.post("/api/upload-cv", status_code=status.HTTP_202_ACCEPTED)
 async def upload_cv(file: UploadFile = File(...), job_id: str = Form(None), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "job_seeker":
         raise HTTPException(status_code=403, detail="Only job seekers can upload CVs")
     try:
         # Convert job_id to integer if provided
         job_id_int = int(job_id) if job_id is not None else None
-        job_title = None
-        if job_id_int is not None:
-            if not os.path.exists(JOB_FILE):
-                raise HTTPException(status_code=404, detail="No job descriptions available")
-            with open(JOB_FILE, 'r') as f:
-                jobs = json.load(f)
-            if job_id_int < 0 or job_id_int >= len(jobs):
-                raise HTTPException(status_code=400, detail="Invalid job ID")
-            job_title = jobs[job_id_int]["jobTitle"]
-
-        file_path = f"temp_{file.filename}"
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        cloud_url = upload_file(file_path)
-        if file.filename.endswith(".pdf"):
-            with open(file_path, "rb") as f:
-                text = extract_text_from_pdf(f)
-        elif file.filename.endswith(".docx"):
-            text = extract_text_from_docx(file_path)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Use PDF or DOCX.")
-        
-        # Validate extracted text
-        if not text.strip():
-            os.remove(file_path)
-            raise HTTPException(status_code=400, detail="Unable to extract text from CV. Please upload a CV with selectable text (not scanned or image-based).")
-
-        structured_content = structure_cv_content(text)
-        if os.path.exists(CV_FILE):
-            with open(CV_FILE, 'r') as f:
-                cvs = json.load(f)
-        else:
-            cvs = []
-        cv_data = {
-            "username": current_user["username"],
-            "filename": file.filename,
-            "cloud_url": cloud_url,
-            "extracted_text": text,
-            "structured_content": structured_content,
-            "job_id": job_id_int,
-            "job_title": job_title
-        }
-        cvs.append(cv_data)
-        with open(CV_FILE, 'w') as f:
-            json.dump(cvs, f, indent=2)
-        os.remove(file_path)
-        return {"message": "CV uploaded and processed successfully", "cloud_url": cloud_url}
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid job_id format; must be an integer")
+    job_title = None
+    if job_id_int is not None:
+        job = storage.get_job(job_id_int)
+        if job is None:
+            raise HTTPException(status_code=400, detail="Invalid job ID")
+        job_title = job["jobTitle"]
+    if not file.filename.lower().endswith((".pdf", ".docx")):
+        raise HTTPException(status_code=400, detail="Unsupported file format. Use PDF or DOCX.")
+
+    try:
+        content = await file.read(MAX_CV_BYTES + 1)
+        if len(content) > MAX_CV_BYTES:
+            raise HTTPException(status_code=413, detail=f"CV files are limited to {MAX_CV_BYTES // (1024 * 1024)} MB")
+        ingestion_id = submit_ingestion(content, file.filename, current_user["username"], job_id_int, job_title)
+    except HTTPException:
+        raise
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing CV: {str(e)}")
+    return {"message": "CV received and queued for processing", "ingestion_id": ingestion_id}
+
+@app.post("/api/bulk-import")
+async def bulk_import_cvs(
+    file: UploadFile = File(...),
+    job_id: int = Form(...),
+    username_prefix: str = Form(""),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can bulk import CVs")
+    if not file.filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Upload a ZIP archive of PDF/DOCX CVs")
+    if storage.get_job(job_id) is None:
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    try:
+        # The archive stays in the upload's spooled temp file; the import runs off the event loop
+        report = await run_in_threadpool(import_cvs, file.file, job_id, username_prefix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing CVs: {str(e)}")
+    return {"message": f"Imported {len(report['imported'])} CVs, {len(report['failed'])} failed", **report}
+
+@app.get("/api/ingestions/{ingestion_id}")
+async def get_ingestion_status(ingestion_id: str, current_user: dict = Depends(get_current_user)):
+    ingestion = storage.get_ingestion(ingestion_id)
+    if ingestion is None:
+        raise HTTPException(status_code=404, detail="Ingestion not found")
+    if current_user["role"] != "admin" and ingestion["username"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="You can only view your own uploads")
+    return ingestion
+
+def _evaluate(job, cv):
+    _, cached = get_evaluation(job, cv)
+    if cached is not None:
+        evaluation = build_evaluation(job, cv, **cached)
+        # Usually already stored by the evaluation that filled the cache; skip the write then
+        stored = storage.get_evaluation(cv["username"], job["id"])
+        if stored is None or any(stored[name] != value for name, value in evaluation.items()):
+            storage.save_evaluation(evaluation)
+        return evaluation
+
+    # Structured during ingestion; only CVs stored before that need it now
+    if not cv["structured_content"]:
+        cv["structured_content"] = structure_cv_content(cv["extracted_text"])
+        storage.update_cv_structured_content(cv["id"], cv["structured_content"])
+
+    if not cv["extracted_text"].strip():
+        raise HTTPException(status_code=400, detail="CV text is empty")
+
+    evaluation = evaluate_cvs(job, [cv])[0]
+    logger.debug("Evaluated cv_id=%s for job_id=%s: %.2f", cv["id"], job["id"], evaluation["relevance_score"])
+
+    storage.save_evaluation(evaluation)
+    return evaluation
 
 class EvaluateCVRequest(BaseModel):
     username: str
@@ -221,129 +287,200 @@ class EvaluateCVRequest(BaseModel):
 
 @app.post("/api/evaluate-cv")
 async def evaluate_cv(request: EvaluateCVRequest, current_user: dict = Depends(get_current_user)):
-    print(f"Received evaluation request: username={request.username}, job_id={request.job_id}, user={current_user}")
+    logger.debug("Evaluation requested: username=%s job_id=%s by %s", request.username, request.job_id, current_user["username"])
     if current_user["role"] not in ["recruiter", "admin"]:
         raise HTTPException(status_code=403, detail="Only recruiters and admins can evaluate CVs")
     try:
         if request.job_id is None:
             raise HTTPException(status_code=400, detail="Job ID is required")
-        if not os.path.exists(JOB_FILE):
-            raise HTTPException(status_code=404, detail="No job descriptions found")
-        if not os.path.exists(CV_FILE):
-            raise HTTPException(status_code=404, detail="No CVs found")
-        with open(JOB_FILE, 'r') as f:
-            jobs = json.load(f)
-        with open(CV_FILE, 'r') as f:
-            cvs = json.load(f)
-
-        print(f"Found {len(jobs)} jobs and {len(cvs)} CVs")
-
+        job = storage.get_job(request.job_id)
         if current_user["role"] == "recruiter":
-            recruiter_jobs = [job for job in jobs if job.get("created_by") == current_user["username"]]
-            print(f"Recruiter jobs: {recruiter_jobs}")
-            if request.job_id < 0 or request.job_id >= len(jobs) or jobs[request.job_id] not in recruiter_jobs:
+            if job is None or job["created_by"] != current_user["username"]:
                 raise HTTPException(status_code=403, detail="You can only evaluate CVs for your own job descriptions")
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job description not found")
 
-        cv = next((cv for cv in cvs if cv["username"] == request.username and cv.get("job_id") == request.job_id), None)
+        cv = storage.get_cv(request.username, request.job_id)
         if not cv:
-            print(f"CV not found for username={request.username}, job_id={request.job_id}")
             raise HTTPException(status_code=404, detail="CV not found for this job description")
 
-        print(f"Found CV: {cv}")
-
-        cv["structured_content"] = structure_cv_content(cv["extracted_text"])
-        with open(CV_FILE, 'w') as f:
-            json.dump(cvs, f, indent=2)
-
-        job = jobs[request.job_id]
-        job_text = f"{job['jobTitle']} requires skills: {job['skills']}, experience: {job['experience']}, traits: {job['traits'] or 'N/A'}"
-        cv_text = cv["extracted_text"]
-        if not cv_text.strip():
-            raise HTTPException(status_code=400, detail="CV text is empty")
-
-        print(f"Job text: {job_text}")
-        print(f"CV text: {cv_text}")
-
-        relevance_score = compute_relevance_score(job_text, cv_text)
-        feedback = generate_feedback(job, cv, relevance_score)
-        evaluation = {
-            "username": cv["username"],
-            "filename": cv["filename"],
-            "relevance_score": relevance_score,
-            "feedback": feedback,
-            "job_title": job["jobTitle"],
-            "job_id": request.job_id
-        }
-
-        print(f"Evaluation result: {evaluation}")
-
-        existing_evaluations = []
-        if os.path.exists(EVALUATION_FILE):
-            with open(EVALUATION_FILE, 'r') as f:
-                existing_evaluations = json.load(f)
-        existing_evaluations = [eval for eval in existing_evaluations if not (eval["username"] == request.username and eval["job_id"] == request.job_id)]
-        existing_evaluations.append(evaluation)
-
-        with open(EVALUATION_FILE, 'w') as f:
-            json.dump(existing_evaluations, f, indent=2)
-
+        # Scoring, and the corpus sync the cache key depends on, block; run them off the event loop
+        evaluation = await run_in_threadpool(_evaluate, job, cv)
         return {"message": "CV evaluated successfully", "evaluation": evaluation}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Evaluation failed: {str(e)}")
+        logger.exception("Evaluation failed for username=%s job_id=%s", request.username, request.job_id)
         raise HTTPException(status_code=500, detail=f"Error evaluating CV: {str(e)}")
     
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus text format; counts are per worker process, so scrape each worker
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/rescoring")
+async def get_rescoring_progress(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view re-scoring progress")
+    return {"enabled": RESCORE_ENABLED, **rescoring_scheduler.progress()}
+
+@app.post("/api/rescoring", status_code=status.HTTP_202_ACCEPTED)
+async def start_rescoring_pass(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can start re-scoring")
+    if not RESCORE_ENABLED:
+        raise HTTPException(status_code=409, detail="Re-scoring is disabled (RESCORE_ENABLED=0)")
+    rescoring_scheduler.trigger()
+    return {"message": "Re-scoring of stale evaluations scheduled"}
+
 @app.get("/api/cvs")
-async def get_cvs(current_user: dict = Depends(get_current_user)):
+async def get_cvs(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] not in ["recruiter", "admin"]:
         raise HTTPException(status_code=403, detail="Only recruiters and admins can view CVs")
+    if output == "ndjson" and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export CVs")
+    columns = parse_fields(fields, storage.CV_FIELDS)
+    after = decode_cursor(cursor)
     try:
-        if not os.path.exists(CV_FILE):
-            return []
-        with open(CV_FILE, 'r') as f:
-            cvs = json.load(f)
-        if current_user["role"] == "recruiter":
-            if not os.path.exists(JOB_FILE):
-                return []
-            with open(JOB_FILE, 'r') as f:
-                jobs = json.load(f)
-            recruiter_job_ids = [idx for idx, job in enumerate(jobs) if job.get("created_by") == current_user["username"]]
-            filtered_cvs = []
-            for cv in cvs:
-                if "job_id" not in cv:
-                    continue
-                job_id = cv["job_id"]
-                if isinstance(job_id, int) and job_id in recruiter_job_ids:
-                    filtered_cvs.append(cv)
-                    continue
-                if isinstance(job_id, str):
-                    try:
-                        job_id_int = int(job_id)
-                        if job_id_int in recruiter_job_ids:
-                            filtered_cvs.append(cv)
-                    except ValueError:
-                        continue
-        else:
-            filtered_cvs = cvs
-        return filtered_cvs
+        job_ids = storage.get_job_ids(current_user["username"]) if current_user["role"] == "recruiter" else None
+        if output == "ndjson":
+            return StreamingResponse(ndjson_lines(storage.iter_cvs(columns, job_ids)), media_type="application/x-ndjson")
+        rows, position = storage.list_cvs_page(columns, job_ids, after, limit)
+        if position is not None:
+            response.headers["X-Next-Cursor"] = encode_cursor(position)
+        return rows
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching CVs: {str(e)}")
 
 @app.get("/api/evaluations")
-async def get_evaluations(current_user: dict = Depends(get_current_user)):
+async def get_evaluations(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    sort: str = Query("id", pattern="^(id|relevance_score)$"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] not in ["recruiter", "admin"]:
         raise HTTPException(status_code=403, detail="Only recruiters and admins can view evaluations")
+    if output == "ndjson" and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export evaluations")
+    columns = parse_fields(fields, storage.EVALUATION_FIELDS)
+    after = decode_cursor(cursor, sort)
     try:
-        if not os.path.exists(EVALUATION_FILE):
-            return []
-        with open(EVALUATION_FILE, 'r') as f:
-            evaluations = json.load(f)
-        if current_user["role"] == "recruiter":
-            if not os.path.exists(JOB_FILE):
-                return []
-            with open(JOB_FILE, 'r') as f:
-                jobs = json.load(f)
-            recruiter_job_ids = [idx for idx, job in enumerate(jobs) if job.get("created_by") == current_user["username"]]
-            evaluations = [eval for eval in evaluations if eval.get("job_id") in recruiter_job_ids]
-        return evaluations
+        job_ids = storage.get_job_ids(current_user["username"]) if current_user["role"] == "recruiter" else None
+        if output == "ndjson":
+            return StreamingResponse(ndjson_lines(storage.iter_evaluations(columns, job_ids, sort)), media_type="application/x-ndjson")
+        rows, position = storage.list_evaluations_page(columns, job_ids, after, limit, sort)
+        if position is not None:
+            response.headers["X-Next-Cursor"] = encode_cursor(position)
+        return rows
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching evaluations: {str(e)}")
+
+def _rank_cvs(job, shortlist):
+    candidates = [cv for cv in storage.list_cvs(job_ids=[job["id"]], latest_only=True) if cv["extracted_text"].strip()]
+    if not candidates:
+        return []
+    # Only the lexical best are embedded and returned when a shortlist is requested
+    if shortlist:
+        candidates = shortlist_cvs(job, candidates, shortlist)
+
+    job_embedding = get_job_embedding(job, build_job_text(job))
+    ranking = [
+        {
+            "username": cv["username"],
+            "filename": cv["filename"],
+            "job_title": job["jobTitle"],
+            "job_id": job["id"],
+            **result
+        }
+        for cv, result in zip(candidates, score_cvs(job, job_embedding, candidates))
+    ]
+    ranking.sort(key=lambda entry: entry["relevance_score"], reverse=True)
+    return ranking
+
+@app.get("/api/job-descriptions/{job_id}/ranking")
+async def rank_cvs_for_job(job_id: int, shortlist: int | None = Query(None, ge=1), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["recruiter", "admin"]:
+        raise HTTPException(status_code=403, detail="Only recruiters and admins can rank CVs")
+    try:
+        job = storage.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job description not found")
+        if current_user["role"] == "recruiter" and job.get("created_by") != current_user["username"]:
+            raise HTTPException(status_code=403, detail="You can only rank CVs for your own job descriptions")
+
+        # Embedding, chunk loads and the BM25 scan are blocking, so they run off the event loop
+        return await run_in_threadpool(_rank_cvs, job, shortlist)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ranking CVs: {str(e)}")
+
+def _matching_jobs(cv, k):
+    sync_job_index()
+    hits = job_index.search(get_cv_vectors([cv["extracted_text"]])[0], k)
+    jobs = storage.list_jobs_by_ids([job_id for job_id, _ in hits])
+    return [
+        {**jobs[job_id], "relevance_score": float(similarity_to_score(similarity))}
+        for job_id, similarity in hits if job_id in jobs
+    ]
+
+def _top_cvs(job, k):
+    sync_cv_index()
+    job_embedding = get_job_embedding(job, build_job_text(job))
+    # Earlier uploads replaced by a newer one stay in the index, so search wider until k current CVs are found
+    fetch = k
+    while True:
+        hits = cv_index.search(job_embedding, fetch)
+        cvs = storage.list_cvs_by_ids([cv_id for cv_id, _ in hits], latest_only=True)
+        if len(cvs) >= k or len(hits) < fetch:
+            break
+        fetch *= 2
+    return [
+        {
+            "cv_id": cv_id,
+            "username": cvs[cv_id]["username"],
+            "filename": cvs[cv_id]["filename"],
+            "job_id": cvs[cv_id]["job_id"],
+            "job_title": cvs[cv_id]["job_title"],
+            "relevance_score": float(similarity_to_score(similarity))
+        }
+        for cv_id, similarity in hits if cv_id in cvs
+    ][:k]
+
+@app.get("/api/cvs/{cv_id}/matching-jobs")
+async def find_matching_jobs(cv_id: int, k: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS), current_user: dict = Depends(get_current_user)):
+    cv = storage.get_cv_by_id(cv_id)
+    if cv is None:
+        raise HTTPException(status_code=404, detail="CV not found")
+    if current_user["role"] != "admin" and cv["username"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="You can only search jobs for your own CVs")
+    try:
+        # Catching up with other workers and embedding the CV block, so they run off the event loop
+        return await run_in_threadpool(_matching_jobs, cv, k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching job descriptions: {str(e)}")
+
+@app.get("/api/job-descriptions/{job_id}/top-cvs")
+async def find_top_cvs(job_id: int, k: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS), current_user: dict = Depends(get_current_user)):
+    if current_user["role"] not in ["recruiter", "admin"]:
+        raise HTTPException(status_code=403, detail="Only recruiters and admins can search CVs")
+    job = storage.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job description not found")
+    if current_user["role"] == "recruiter" and job["created_by"] != current_user["username"]:
+        raise HTTPException(status_code=403, detail="You can only search CVs for your own job descriptions")
+    try:
+        return await run_in_threadpool(_top_cvs, job, k)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching evaluations: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error searching CVs: {str(e)}")
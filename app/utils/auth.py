@@ -1,7 +1,14 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.utils.metrics import record_cache
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -11,12 +18,26 @@ SECRET_KEY = "your-secret-key"  # In production, use a secure key from environme
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified token claims are reused for this long (never past the token's own expiry)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt takes a few hundred milliseconds per call, so async endpoints run it off the event loop
+async def hash_password_async(password: str) -> str:
+    return await run_in_threadpool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -24,13 +45,41 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _get_cached_claims(key):
+    now = time.time()
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= now:
+            del _token_cache[key]
+            return None
+        return claims
+
+def _cache_claims(key, claims, token_exp):
+    expires_at = time.time() + TOKEN_CACHE_TTL
+    if token_exp is not None:
+        expires_at = min(expires_at, token_exp)
+    with _token_cache_lock:
+        _token_cache[key] = (claims, expires_at)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
 def decode_access_token(token: str):
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _get_cached_claims(key)
+    record_cache("token", claims is not None)
+    if claims is not None:
+        return dict(claims)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
         if username is None or role is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return {"username": username, "role": role}
+        claims = {"username": username, "role": role}
+        _cache_claims(key, claims, payload.get("exp"))
+        return dict(claims)
     except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import storage
+from app.utils.cache import invalidate_cv
+from app.utils.chunking import chunk_cv
+from app.utils.cv_parser import structure_cv_content
+from app.utils.embeddings import model_id
+from app.utils.extraction import EXTRACTION_WORKERS, MAX_CV_BYTES, extract_cv_text
+from app.utils.faiss_index import cv_index
+from app.utils.lexical_index import cv_lexical_index
+from app.utils.metrics import record_cache, timed
+from app.utils.object_storage import submit_upload
+from app.utils.rag_model import embed_texts
+from app.utils.vector_store import get_cv_vectors
+
+# Files read, extracted and embedded together and written in one transaction
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "128"))
+# Threads feeding the extraction process pool; one per extraction worker keeps every core busy
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", str(EXTRACTION_WORKERS)))
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+logger = logging.getLogger(__name__)
+
+def _iter_zip(file):
+    # Members are read one at a time straight from the archive; nothing is extracted to disk
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            if info.file_size > MAX_CV_BYTES:
+                yield info.filename, None, f"File is larger than {MAX_CV_BYTES // (1024 * 1024)} MB"
+                continue
+            with archive.open(info) as member:
+                content = member.read(MAX_CV_BYTES + 1)
+            if len(content) > MAX_CV_BYTES:
+                yield info.filename, None, f"File is larger than {MAX_CV_BYTES // (1024 * 1024)} MB"
+                continue
+            yield info.filename, content, None
+
+def _iter_directory(path):
+    for root, _, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            full_path = os.path.join(root, filename)
+            name = os.path.relpath(full_path, path)
+            if os.path.getsize(full_path) > MAX_CV_BYTES:
+                yield name, None, f"File is larger than {MAX_CV_BYTES // (1024 * 1024)} MB"
+                continue
+            with open(full_path, "rb") as f:
+                yield name, f.read(), None
+
+def iter_cv_files(source):
+    """Yield (name, bytes, error) for each PDF/DOCX in a directory path, ZIP path or ZIP file object."""
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        return _iter_directory(source)
+    if not zipfile.is_zipfile(source):
+        raise ValueError("Bulk import expects a ZIP archive or a directory")
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return _iter_zip(source)
+
+def username_for(name, content_hash, prefix=""):
+    """CVs are stored per username, so each imported file gets one from its path and contents.
+
+    The whole relative path keeps a/cv.pdf and b/cv.pdf apart, and the content hash keeps cv.pdf and cv.docx
+    apart; re-importing the same file yields the same username, so it replaces the earlier upload.
+    """
+    stem = os.path.splitext(name)[0].lower()
+    return f"{prefix}{re.sub(r'[^a-z0-9._-]+', '_', stem).strip('_') or 'cv'}-{content_hash[:8]}"
+
+def _prepare(name, content):
+    text = extract_cv_text(content, name)
+    if not text.strip():
+        raise ValueError("Unable to extract text from CV (scanned or image-based?)")
+    structured_content = structure_cv_content(text)
+    return text, structured_content, chunk_cv(text, structured_content)
+
+def _try_prepare(item):
+    try:
+        return _prepare(*item), None
+    except Exception as e:
+        return None, str(e)
+
+@timed("bulk_import_batch")
+def _import_batch(pool, batch, job, username_prefix, report):
+    hashes = [hashlib.sha256(content).hexdigest() for _, content in batch]
+    stored = storage.get_cv_contents(hashes)
+    # Files imported before, or repeated within the batch, are extracted, structured and embedded once
+    pending = {}
+    for (name, content), content_hash in zip(batch, hashes):
+        if content_hash not in stored and content_hash not in pending:
+            pending[content_hash] = (name, content)
+    record_cache("cv_content", False, len(pending))
+    record_cache("cv_content", True, len(batch) - len(pending))
+
+    prepared = dict(zip(pending, pool.map(_try_prepare, pending.values())))
+    # Only files that extracted are uploaded, so failed ones leave nothing behind in object storage
+    uploads = []
+    for (name, content), content_hash in zip(batch, hashes):
+        error = prepared[content_hash][1] if content_hash in prepared else None
+        if error is None:
+            uploads.append((name, content_hash, submit_upload(content, name)))
+        else:
+            report["failed"].append({"filename": name, "error": error})
+    ready = []
+    for name, content_hash, upload in uploads:
+        try:
+            ready.append((name, content_hash, upload.result()))
+        except Exception as e:
+            report["failed"].append({"filename": name, "error": str(e)})
+    if not ready:
+        return
+
+    # One embedding pass over every chunk of the new files, then split back per file
+    # Contents of files whose upload failed are reported as errors and not stored
+    uploaded = {content_hash for _, content_hash, _ in ready}
+    new = {content_hash: result for content_hash, (result, error) in prepared.items() if error is None and content_hash in uploaded}
+    chunk_texts = [chunk["text"] for _, _, chunks in new.values() for chunk in chunks]
+    matrix = embed_texts(chunk_texts) if chunk_texts else None
+    contents = []
+    offset = 0
+    for content_hash, (text, structured_content, chunks) in new.items():
+        contents.append((content_hash, text, structured_content, chunks, matrix[offset:offset + len(chunks)] if chunks else []))
+        offset += len(chunks)
+
+    text_by_hash = {content_hash: text for content_hash, (text, _) in stored.items()}
+    text_by_hash.update((content_hash, text) for content_hash, (text, _, _) in new.items())
+    cv_rows = [
+        {
+            "username": username_for(name, content_hash, username_prefix),
+            "filename": os.path.basename(name),
+            "cloud_url": cloud_url,
+            # Text and structure are read from cv_contents
+            "extracted_text": "",
+            "content_hash": content_hash,
+            "job_id": job["id"],
+            "job_title": job["jobTitle"],
+        }
+        for name, content_hash, cloud_url in ready
+    ]
+    texts = [text_by_hash[content_hash] for _, content_hash, _ in ready]
+    cv_vectors = get_cv_vectors(texts)
+    cv_ids = storage.add_cvs_with_contents(contents, cv_rows, model_id())
+    cv_index.add(cv_ids, cv_vectors)
+    for cv_id, cv_data, text in zip(cv_ids, cv_rows, texts):
+        cv_lexical_index.add(cv_id, text)
+        invalidate_cv(cv_data["username"], job["id"])
+        report["imported"].append({"filename": cv_data["filename"], "username": cv_data["username"], "cv_id": cv_id})
+
+def import_cvs(source, job_id, username_prefix="", workers=BULK_IMPORT_WORKERS, batch_size=BULK_IMPORT_BATCH_SIZE):
+    """Import every PDF/DOCX in a ZIP or directory as CVs for a job.
+
+    Returns {"imported": [...], "failed": [{"filename", "error"}]}; one bad file never stops the import.
+    """
+    job = storage.get_job(job_id)
+    if job is None:
+        raise ValueError(f"Job description {job_id} not found")
+
+    report = {"imported": [], "failed": []}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bulk-import") as pool:
+        batch = []
+        for name, content, error in iter_cv_files(source):
+            if error is not None:
+                report["failed"].append({"filename": name, "error": error})
+                continue
+            batch.append((name, content))
+            if len(batch) >= batch_size:
+                _import_batch(pool, batch, job, username_prefix, report)
+                batch = []
+        if batch:
+            _import_batch(pool, batch, job, username_prefix, report)
+    logger.info("Bulk import for job %s: %d imported, %d failed", job_id, len(report["imported"]), len(report["failed"]))
+    return report
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from app.utils import storage
+from app.utils.embeddings import model_id
+from app.utils.metrics import record_cache
+from app.utils.rag_model import embed_texts
+from app.utils.scoring import scoring_id
+from app.utils.vector_store import content_hash
+
+EVALUATION_CACHE_SIZE = int(os.getenv("EVALUATION_CACHE_SIZE", "10000"))
+JOB_EMBEDDING_CACHE_SIZE = int(os.getenv("JOB_EMBEDDING_CACHE_SIZE", "1024"))
+# Also keep evaluations in the database so they survive restarts and are shared between workers
+EVALUATION_DISK_CACHE = os.getenv("EVALUATION_DISK_CACHE", "0") == "1"
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop_where(self, predicate):
+        with self.lock:
+            for key in [key for key, value in self.data.items() if predicate(value)]:
+                del self.data[key]
+
+    def __len__(self):
+        return len(self.data)
+
+evaluation_cache = LRUCache(EVALUATION_CACHE_SIZE)
+job_embedding_cache = LRUCache(JOB_EMBEDDING_CACHE_SIZE)
+
+def job_hash(job):
+    fields = [job["jobTitle"], job["skills"], job["experience"], job.get("traits")]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+def evaluation_key(job, cv):
+    # Anything that changes the score or feedback must be part of the key; deduplicated CVs
+    # already carry a hash of their file, so only older rows need their text hashed
+    cv_hash = cv.get("content_hash") or content_hash(cv["extracted_text"])
+    return f"{model_id()}|{scoring_id()}|{job_hash(job)}|{cv_hash}"
+
+def get_job_embedding(job, job_text):
+    key = f"{model_id()}|{job_hash(job)}"
+    embedding = job_embedding_cache.get(key)
+    record_cache("job_embedding", embedding is not None)
+    if embedding is None:
+        embedding = embed_texts([job_text])[0]
+        job_embedding_cache.put(key, embedding)
+    return embedding
+
+def get_evaluation(job, cv):
+    """Return (key, cached result or None) for a job/CV pair."""
+    key = evaluation_key(job, cv)
+    entry = evaluation_cache.get(key)
+    if entry is not None:
+        record_cache("evaluation", True)
+        return key, entry["value"]
+    if EVALUATION_DISK_CACHE:
+        value = storage.get_cached_evaluation(key)
+        if value is not None:
+            record_cache("evaluation_disk", True)
+            evaluation_cache.put(key, {"value": value, "job_id": job["id"], "username": cv["username"]})
+            return key, value
+        record_cache("evaluation_disk", False)
+    record_cache("evaluation", False)
+    return key, None
+
+def put_evaluation(key, job, cv, value):
+    evaluation_cache.put(key, {"value": value, "job_id": job["id"], "username": cv["username"]})
+    if EVALUATION_DISK_CACHE:
+        storage.put_cached_evaluation(key, job["id"], cv["username"], value)
+
+def invalidate_job(job_id):
+    evaluation_cache.pop_where(lambda entry: entry["job_id"] == job_id)
+    if EVALUATION_DISK_CACHE:
+        storage.delete_cached_evaluations(job_id=job_id)
+
+def invalidate_cv(username, job_id):
+    evaluation_cache.pop_where(lambda entry: entry["username"] == username and entry["job_id"] == job_id)
+    if EVALUATION_DISK_CACHE:
+        storage.delete_cached_evaluations(job_id=job_id, username=username)
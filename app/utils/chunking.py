@@ -0,0 +1,99 @@
+import os
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.utils import storage
+from app.utils.embeddings import model_id
+from app.utils.metrics import record_cache
+from app.utils.rag_model import embed_texts, similarity_to_score
+
+# all-MiniLM-L6-v2 truncates at 256 word-pieces; ~600 characters of CV text stays safely below that
+CHUNK_SIZE = int(os.getenv("CV_CHUNK_SIZE", "600"))
+CHUNK_OVERLAP = int(os.getenv("CV_CHUNK_OVERLAP", "80"))
+CHUNK_SCORE_POLICY = os.getenv("CHUNK_SCORE_POLICY", "max")
+SCORE_POLICIES = ("max", "mean", "section_weighted")
+SECTION_WEIGHTS = {
+    "experience": 1.0,
+    "skills": 1.0,
+    "education": 0.6,
+    "positions_of_responsibility": 0.5,
+    "other": 0.4,
+}
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+def chunk_cv(text, structured_content):
+    """Split a CV into embeddable chunks, one or more per section found by structure_cv_content."""
+    chunks = []
+    assigned = set()
+    for section, lines in (structured_content or {}).items():
+        assigned.update(lines)
+        if lines:
+            label = section.replace("_", " ").title()
+            chunks.extend({"section": section, "text": f"{label}: {piece}"} for piece in splitter.split_text("\n".join(lines)))
+
+    # Headers, summaries and anything the section parser did not place
+    other_lines = [line.strip() for line in text.split("\n") if line.strip() and line.strip() not in assigned]
+    if other_lines:
+        chunks.extend({"section": "other", "text": piece} for piece in splitter.split_text("\n".join(other_lines)))
+    return chunks
+
+def embed_cv_chunks(cv):
+    """Chunk a CV, embed every chunk in one batch and cache the vectors next to the CV record (or its content)."""
+    chunks = chunk_cv(cv["extracted_text"], cv.get("structured_content"))
+    if not chunks:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    matrix = embed_texts([chunk["text"] for chunk in chunks])
+    storage.save_cv_chunks(cv, chunks, matrix, model_id())
+    return [chunk["section"] for chunk in chunks], matrix
+
+def get_cv_chunk_vectors(cvs):
+    """Return {cv_id: (sections, matrix)}, chunking and embedding CVs with no chunks cached from the current model."""
+    # Chunks from another model are re-embedded, so a model rollout never scores new job vectors against old CV vectors
+    cached = storage.get_cv_chunks(cvs, model_id())
+    record_cache("cv_chunks", True, len(cached))
+    record_cache("cv_chunks", False, len(cvs) - len(cached))
+    embedded = {}
+    for cv in cvs:
+        if cv["id"] in cached:
+            continue
+        # Uploads of the same file share one set of chunk vectors
+        content_hash = cv.get("content_hash")
+        if content_hash and content_hash in embedded:
+            cached[cv["id"]] = embedded[content_hash]
+        else:
+            cached[cv["id"]] = embedded[content_hash] = embed_cv_chunks(cv)
+    return cached
+
+def aggregate_chunk_similarities(similarities, sections, policy=CHUNK_SCORE_POLICY):
+    if len(similarities) == 0:
+        return -1.0
+    if policy == "max":
+        return float(np.max(similarities))
+    if policy == "mean":
+        return float(np.mean(similarities))
+    if policy == "section_weighted":
+        # Best chunk per section, then a weighted average across the sections present
+        best = {}
+        for section, similarity in zip(sections, similarities):
+            best[section] = max(best.get(section, -1.0), float(similarity))
+        weights = {section: SECTION_WEIGHTS.get(section, SECTION_WEIGHTS["other"]) for section in best}
+        return sum(best[s] * weights[s] for s in best) / sum(weights.values())
+    raise ValueError(f"Unknown chunk score policy: {policy}. Use one of {', '.join(SCORE_POLICIES)}")
+
+def score_cv_chunks(job_embedding, chunk_vectors, policy=CHUNK_SCORE_POLICY):
+    """Score CVs given as a list of (sections, matrix) with one matrix-vector product over all their chunks."""
+    matrices = [matrix for _, matrix in chunk_vectors if len(matrix)]
+    if not matrices:
+        return np.zeros(len(chunk_vectors), dtype=np.float32)
+    similarities = np.vstack(matrices) @ job_embedding
+
+    scores = []
+    offset = 0
+    for sections, matrix in chunk_vectors:
+        if not len(matrix):
+            scores.append(0.0)
+            continue
+        cv_similarities = similarities[offset:offset + len(matrix)]
+        offset += len(matrix)
+        scores.append(float(similarity_to_score(aggregate_chunk_similarities(cv_similarities, sections, policy))))
+    return np.array(scores, dtype=np.float32)
@@ -1,5 +1,4 @@
 import cloudinary
-import cloudinary.uploader
 import os
 
 # Configure Cloudinary with credentials from environment variables
@@ -9,14 +8,3 @@ cloudinary.config(
     api_secret=os.getenv("CLOUDINARY_API_SECRET", "vGLex0RB22x2kpttHGhPVW9cR7A"),
     secure=True
 )
-
-def upload_file(file_path):
-    try:
-        response = cloudinary.uploader.upload(
-            file_path,
-            resource_type="raw",  # For non-image files like PDF/DOCX
-            folder="cv_uploads"   # Store CVs in a folder named "cv_uploads"
-        )
-        return response["secure_url"]
-    except Exception as e:
-        raise Exception(f"Error uploading to Cloudinary: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,47 @@
+import io
+import PyPDF2
+from docx import Document
+from app.utils.matchers import SECTION_CUE_MATCHER, SECTION_HEADER_MATCHER
+from app.utils.metrics import timed
+
+def extract_text_from_pdf(file, max_pages=None):
+    pdf_reader = PyPDF2.PdfReader(file)
+    if max_pages is not None and len(pdf_reader.pages) > max_pages:
+        raise ValueError(f"PDF has {len(pdf_reader.pages)} pages; the limit is {max_pages}")
+    return "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
+
+def extract_text_from_docx(file):
+    doc = Document(file)
+    return "".join(f"{para.text}\n" for para in doc.paragraphs)
+
+def extract_text(content, filename, max_pages=None):
+    """Extract text from raw PDF/DOCX bytes without touching the filesystem."""
+    extension = filename.lower()
+    if extension.endswith(".pdf"):
+        return extract_text_from_pdf(io.BytesIO(content), max_pages=max_pages)
+    if extension.endswith(".docx"):
+        return extract_text_from_docx(io.BytesIO(content))
+    raise ValueError("Unsupported file format. Use PDF or DOCX.")
+
+@timed("structuring")
+def structure_cv_content(text):
+    sections = {"education": [], "experience": [], "skills": [], "positions_of_responsibility": []}
+    lines = text.split('\n')
+    current_section = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        line_lower = line.lower()
+        header = SECTION_HEADER_MATCHER.match(line_lower)
+        if header:
+            current_section = None if header == "end" else header
+        elif current_section:
+            sections[current_section].append(line)
+        else:
+            cue = SECTION_CUE_MATCHER.match(line_lower)
+            if cue:
+                sections[cue].append(line)
+
+    return sections
@@ -0,0 +1,80 @@
+import base64
+import os
+import threading
+import numpy as np
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# torch: sentence-transformers on PyTorch (default)
+# onnx: the model's ONNX export on ONNX Runtime
+# onnx-int8: the int8-quantized ONNX export, fastest on CPU-only nodes
+# remote: a shared embedding server (app/embedding_server.py) so workers don't each load the weights
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8", "remote")
+ONNX_INT8_FILE = os.getenv("ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL", "http://127.0.0.1:8001")
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "30"))
+
+_model = None
+_model_lock = threading.Lock()
+
+class RemoteEmbeddings:
+    """Client for the embedding server, with the same interface as HuggingFaceEmbeddings."""
+
+    def __init__(self, url):
+        import httpx
+
+        self.client = httpx.Client(base_url=url, timeout=EMBEDDING_SERVER_TIMEOUT)
+        self.model_id = self.client.get("/info").raise_for_status().json()["model_id"]
+
+    def embed_documents(self, texts):
+        response = self.client.post("/embed", json={"texts": texts}).raise_for_status().json()
+        return decode_vectors(response["vectors"], response["shape"]).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def encode_vectors(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    return {"vectors": base64.b64encode(matrix.tobytes()).decode("ascii"), "shape": list(matrix.shape)}
+
+def decode_vectors(vectors, shape):
+    return np.frombuffer(base64.b64decode(vectors), dtype=np.float32).reshape(shape)
+
+def load_model(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Use one of {', '.join(BACKENDS)}")
+    if backend == "remote":
+        return RemoteEmbeddings(EMBEDDING_SERVER_URL)
+
+    # Imported here so that importing the app doesn't pull in torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    model_kwargs = {}
+    if backend == "onnx":
+        model_kwargs = {"backend": "onnx"}
+    elif backend == "onnx-int8":
+        model_kwargs = {"backend": "onnx", "model_kwargs": {"file_name": ONNX_INT8_FILE}}
+    try:
+        return HuggingFaceEmbeddings(model_name=MODEL_NAME, model_kwargs=model_kwargs)
+    except Exception as e:
+        raise Exception(f"Failed to initialize embeddings model: {str(e)}")
+
+def get_embeddings_model():
+    """Return the shared embeddings model, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(EMBEDDING_BACKEND)
+    return _model
+
+def model_id():
+    """Identifies the vectors produced, so results from a different model or backend are never mixed."""
+    if EMBEDDING_BACKEND == "remote":
+        return get_embeddings_model().model_id
+    return f"{MODEL_NAME}@{EMBEDDING_BACKEND}"
+
+def warm_up():
+    get_embeddings_model().embed_query("warm up")
@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.cv_parser import extract_text
+from app.utils.metrics import timed
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+MAX_CV_BYTES = int(os.getenv("MAX_CV_BYTES", str(10 * 1024 * 1024)))
+MAX_CV_PAGES = int(os.getenv("MAX_CV_PAGES", "30"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "20"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+class ExtractionError(Exception):
+    pass
+
+# A BaseException so the parsers' own "except Exception" blocks cannot swallow it
+class _WallClockExceeded(BaseException):
+    pass
+
+def _raise_timeout(signum, frame):
+    raise _WallClockExceeded()
+
+def _extract_in_worker(content, filename, max_pages, timeout):
+    # PyPDF2 and python-docx are pure Python, so an alarm interrupts even a pathological document
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return extract_text(content, filename, max_pages=max_pages)
+    except _WallClockExceeded:
+        raise ExtractionError(f"Text extraction took longer than {timeout:g} seconds")
+    except ValueError as e:
+        raise ExtractionError(str(e))
+    except Exception as e:
+        raise ExtractionError(f"Could not read {os.path.basename(filename)}: {str(e)}")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers only import the parser module, not the app and its model
+            _executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+def _reset_executor(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def _terminate_executor(stuck):
+    # A worker that ignores the alarm never frees its slot, so the whole pool is replaced and its processes
+    # killed; other extractions running in it fail with BrokenProcessPool
+    processes = list((getattr(stuck, "_processes", None) or {}).values())
+    _reset_executor(stuck)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+@timed("extraction")
+def extract_cv_text(content, filename):
+    """Extract CV text in a worker process, enforcing the size, page and wall-clock limits."""
+    if len(content) > MAX_CV_BYTES:
+        raise ExtractionError(f"File is {len(content)} bytes; the limit is {MAX_CV_BYTES}")
+    if not filename.lower().endswith((".pdf", ".docx")):
+        raise ExtractionError("Unsupported file format. Use PDF or DOCX.")
+
+    executor = _get_executor()
+    try:
+        future = executor.submit(_extract_in_worker, content, filename, MAX_CV_PAGES, EXTRACTION_TIMEOUT)
+        # The in-worker alarm normally fires first; this catches parsers stuck outside Python code
+        return future.result(timeout=EXTRACTION_TIMEOUT + 5)
+    except FutureTimeoutError:
+        _terminate_executor(executor)
+        raise ExtractionError(f"Text extraction took longer than {EXTRACTION_TIMEOUT:g} seconds")
+    except _WallClockExceeded:
+        raise ExtractionError(f"Text extraction took longer than {EXTRACTION_TIMEOUT:g} seconds")
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise ExtractionError("Text extraction worker crashed")
+
+def shutdown():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+import faiss
+import numpy as np
+from app.utils import storage
+from app.utils.cache import job_hash
+from app.utils.embeddings import model_id
+from app.utils.rag_model import EMBEDDING_DIM, embed_texts
+from app.utils.scoring import build_job_text
+from app.utils.vector_store import get_cv_vectors
+
+logger = logging.getLogger(__name__)
+
+CV_INDEX_FILE = "cv_index.faiss"
+JOB_INDEX_FILE = "job_index.faiss"
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+# Writing a large HNSW graph is expensive, so flush after this many additions (and on shutdown)
+SAVE_EVERY = int(os.getenv("FAISS_SAVE_EVERY", "50"))
+# CVs loaded per query when catching up with the database
+SYNC_BATCH_SIZE = 500
+
+class VectorIndex:
+    """Persistent inner-product index over normalized vectors, keyed by database id."""
+
+    def __init__(self, path, hnsw=True, save_every=SAVE_EVERY):
+        self.path = path
+        self.hnsw = hnsw
+        self.save_every = save_every
+        self.pending = 0
+        # The embedding model the vectors came from, written next to the index
+        self.model_path = path + ".model"
+        self.model = None
+        # Ingestion workers add vectors while request handlers search
+        self.lock = threading.Lock()
+        # Only one thread backfills from the database at a time; others search what is indexed so far
+        self.sync_lock = threading.Lock()
+        # Highest database id checked against the index, and the version each id was embedded from
+        # (None for ids loaded from disk)
+        self.synced_id = 0
+        self.versions = {}
+        if os.path.exists(path):
+            self.index = faiss.read_index(path)
+            self.versions = dict.fromkeys(faiss.vector_to_array(self.index.id_map).tolist())
+            if os.path.exists(self.model_path):
+                with open(self.model_path) as f:
+                    self.model = f.read().strip()
+        else:
+            self.index = self._new_index()
+        if self.hnsw:
+            faiss.downcast_index(self.index.index).hnsw.efSearch = HNSW_EF_SEARCH
+
+    def _new_index(self):
+        if self.hnsw:
+            base = faiss.IndexHNSWFlat(EMBEDDING_DIM, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efSearch = HNSW_EF_SEARCH
+        else:
+            base = faiss.IndexFlatIP(EMBEDDING_DIM)
+        return faiss.IndexIDMap2(base)
+
+    def _check_model(self):
+        # Vectors from different embedding models are not comparable, so an index built with another model
+        # starts over empty; the startup sync re-adds every missing id with the current model
+        current = model_id()
+        if self.model == current:
+            return
+        if self.index.ntotal:
+            logger.warning("Rebuilding %s: built with %s, now using %s", self.path, self.model or "an unknown model", current)
+        self.index = self._new_index()
+        self.model = current
+        self.synced_id = 0
+        self.versions = {}
+        self._save()
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def ids(self):
+        with self.lock:
+            self._check_model()
+            return set(self.versions)
+
+    def indexed_versions(self):
+        with self.lock:
+            self._check_model()
+            return dict(self.versions)
+
+    def missing(self, ids):
+        with self.lock:
+            self._check_model()
+            return [i for i in ids if i not in self.versions]
+
+    def add(self, ids, vectors, versions=None):
+        """Add vectors by id, skipping ids that are already indexed (another thread may have backfilled them)."""
+        with self.lock:
+            self._check_model()
+            self._add(ids, vectors, versions)
+
+    def replace(self, ids, vectors, versions=None):
+        """Swap the vectors of existing ids (adding any that are new); only the flat index supports this."""
+        with self.lock:
+            self._check_model()
+            self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            for i in ids:
+                self.versions.pop(i, None)
+            self._add(ids, vectors, versions)
+
+    def _add(self, ids, vectors, versions):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), EMBEDDING_DIM)
+        versions = versions or [None] * len(ids)
+        keep = [row for row, i in enumerate(ids) if i not in self.versions]
+        if not keep:
+            return
+        self.index.add_with_ids(vectors[keep], np.asarray([ids[row] for row in keep], dtype=np.int64))
+        self.versions.update((ids[row], versions[row]) for row in keep)
+        self.pending += len(keep)
+        if self.pending >= self.save_every:
+            self._save()
+
+    def search(self, vector, k=10):
+        """Return up to k (id, inner product) pairs, best first."""
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, EMBEDDING_DIM)
+        with self.lock:
+            self._check_model()
+            if self.index.ntotal == 0:
+                return []
+            scores, ids = self.index.search(query, min(k, self.index.ntotal))
+        return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        # Per process, since every worker flushes its own copy to the same file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.path)
+        with open(self.model_path, "w") as f:
+            f.write(self.model or "")
+        self.pending = 0
+
+cv_index = VectorIndex(CV_INDEX_FILE)
+# Job postings are few and get replaced, so an exact flat index is enough
+job_index = VectorIndex(JOB_INDEX_FILE, hnsw=False, save_every=1)
+
+# Each worker process has its own copy of the indexes, so before searching they pick up what other
+# workers (or this one, before a restart) stored in the database
+
+def sync_cv_index():
+    """Index CVs added since this process last checked; returns how many were added."""
+    if not cv_index.sync_lock.acquire(blocking=False):
+        return 0
+    try:
+        added = 0
+        new_ids = storage.list_cv_ids(after_id=cv_index.synced_id)
+        for start in range(0, len(new_ids), SYNC_BATCH_SIZE):
+            batch = new_ids[start:start + SYNC_BATCH_SIZE]
+            cvs = [cv for cv in storage.list_cvs_by_ids(cv_index.missing(batch)).values() if cv["extracted_text"].strip()]
+            if cvs:
+                cv_index.add([cv["id"] for cv in cvs], get_cv_vectors([cv["extracted_text"] for cv in cvs]))
+            cv_index.synced_id = max(cv_index.synced_id, batch[-1])
+            added += len(cvs)
+        return added
+    finally:
+        cv_index.sync_lock.release()
+
+def sync_job_index():
+    """Index new jobs and re-embed jobs edited since they were indexed; returns how many were embedded."""
+    if not job_index.sync_lock.acquire(blocking=False):
+        return 0
+    try:
+        # Ids loaded from disk have no version, so every job is embedded once per process
+        indexed = job_index.indexed_versions()
+        stale = [(job, job_hash(job)) for job in storage.list_jobs()]
+        stale = [(job, version) for job, version in stale if indexed.get(job["id"]) != version]
+        if stale:
+            job_index.replace(
+                [job["id"] for job, _ in stale],
+                embed_texts([build_job_text(job) for job, _ in stale]),
+                [version for _, version in stale],
+            )
+        return len(stale)
+    finally:
+        job_index.sync_lock.release()
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import extraction, storage
+from app.utils.cache import invalidate_cv
+from app.utils.chunking import get_cv_chunk_vectors
+from app.utils.cv_parser import structure_cv_content
+from app.utils.faiss_index import cv_index
+from app.utils.lexical_index import cv_lexical_index
+from app.utils.metrics import record_cache
+from app.utils.object_storage import submit_upload
+from app.utils.vector_store import get_cv_vectors
+
+INGEST_IO_WORKERS = int(os.getenv("INGEST_IO_WORKERS", "4"))
+# Uploads accepted but not yet finished; beyond this new uploads are turned away
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "256"))
+
+STATUSES = ("queued", "extracting", "structuring", "embedding", "storing", "completed", "failed")
+
+logger = logging.getLogger(__name__)
+
+io_executor = ThreadPoolExecutor(max_workers=INGEST_IO_WORKERS, thread_name_prefix="ingest")
+_slots = threading.BoundedSemaphore(INGEST_MAX_PENDING)
+
+class IngestionQueueFull(Exception):
+    pass
+
+def submit_ingestion(content, filename, username, job_id=None, job_title=None):
+    """Record a new ingestion, queue its pipeline and return the ingestion id."""
+    if not _slots.acquire(blocking=False):
+        raise IngestionQueueFull("Too many CVs are being processed; please retry shortly")
+    ingestion_id = uuid.uuid4().hex
+    try:
+        storage.create_ingestion({
+            "id": ingestion_id,
+            "username": username,
+            "filename": filename,
+            "job_id": job_id,
+            "status": "queued",
+        })
+        # The upload runs alongside extraction and embedding instead of before them
+        upload = submit_upload(content, filename)
+        io_executor.submit(_run_ingestion, ingestion_id, content, filename, username, job_id, job_title, upload)
+    except Exception:
+        _slots.release()
+        raise
+    return ingestion_id
+
+def _run_ingestion(ingestion_id, content, filename, username, job_id, job_title, upload):
+    try:
+        content_hash = hashlib.sha256(content).hexdigest()
+        storage.update_ingestion(ingestion_id, status="extracting")
+        # The same file uploaded before, usually for another job, is not extracted, structured or embedded again
+        stored = storage.get_cv_contents([content_hash]).get(content_hash)
+        record_cache("cv_content", stored is not None)
+        if stored is not None:
+            text, structured_content = stored
+        else:
+            text = extraction.extract_cv_text(content, filename)
+            if not text.strip():
+                raise ValueError("Unable to extract text from CV. Please upload a CV with selectable text (not scanned or image-based).")
+
+            storage.update_ingestion(ingestion_id, status="structuring")
+            structured_content = structure_cv_content(text)
+            storage.save_cv_content(content_hash, text, structured_content)
+
+        storage.update_ingestion(ingestion_id, status="embedding")
+        # Chunks of deduplicated uploads are stored per content, so no CV id is needed yet
+        get_cv_chunk_vectors([{"id": None, "content_hash": content_hash, "extracted_text": text, "structured_content": structured_content}])
+        cv_vector = get_cv_vectors([text])
+
+        storage.update_ingestion(ingestion_id, status="storing")
+        cloud_url = upload.result()
+
+        # The CV becomes visible only once every stage that can fail has succeeded
+        cv_id = storage.add_cv({
+            "username": username,
+            "filename": filename,
+            "cloud_url": cloud_url,
+            # Text and structure are read from cv_contents
+            "extracted_text": "",
+            "content_hash": content_hash,
+            "job_id": job_id,
+            "job_title": job_title
+        })
+        invalidate_cv(username, job_id)
+        cv_lexical_index.add(cv_id, text)
+        cv_index.add([cv_id], cv_vector)
+
+        storage.update_ingestion(ingestion_id, status="completed", cv_id=cv_id, cloud_url=cloud_url)
+    except Exception as e:
+        upload.cancel()
+        logger.warning("Ingestion %s failed: %s", ingestion_id, e)
+        storage.update_ingestion(ingestion_id, status="failed", error=str(e))
+    finally:
+        _slots.release()
+
+def shutdown():
+    io_executor.shutdown(wait=True)
+    extraction.shutdown()
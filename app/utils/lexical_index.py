@@ -0,0 +1,138 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from app.utils import storage
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Corpus statistics are taken over CV ids up to a milestone, and milestones are this factor apart, so scores
+# (and the cached evaluations keyed on the milestone) only shift once the corpus has grown by that much
+CORPUS_GROWTH_STEP = 1.1
+SYNC_BATCH_SIZE = 500
+
+# Keeps skill spellings such as "c++", "c#", "node.js" and "b.tech" in one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+def corpus_milestone(doc_id):
+    """The largest milestone id not above doc_id; milestones are consecutive at first, then CORPUS_GROWTH_STEP apart."""
+    milestone = 0
+    while True:
+        following = max(milestone + 1, math.ceil(milestone * CORPUS_GROWTH_STEP))
+        if following > doc_id:
+            return milestone
+        milestone = following
+
+class BM25Index:
+    """In-memory inverted index over CV text, updated one document at a time.
+
+    Document frequencies and the average length come from documents with ids up to corpus_milestone(synced_id),
+    so every worker that has synced with the same database computes the same scores.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}
+        self.lock = threading.Lock()
+        # Every database id up to this one is indexed (by sync_lexical_index, one sync at a time)
+        self.synced_id = 0
+        self.sync_lock = threading.Lock()
+        # (milestone, document count, average length, {term: document frequency})
+        self.statistics = None
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self.lock:
+            if doc_id in self.doc_lengths:
+                return
+            for term, count in counts.items():
+                self.postings[term][doc_id] = count
+            self.doc_lengths[doc_id] = sum(counts.values())
+
+    def corpus_version(self):
+        return corpus_milestone(self.synced_id)
+
+    def _statistics(self):
+        milestone = corpus_milestone(self.synced_id)
+        if self.statistics is None or self.statistics[0] != milestone:
+            lengths = [length for doc_id, length in self.doc_lengths.items() if doc_id <= milestone]
+            self.statistics = (milestone, len(lengths), sum(lengths) / len(lengths) if lengths else 0.0, {})
+        return self.statistics
+
+    def idf(self, term):
+        milestone, count, _, frequencies = self._statistics()
+        if term not in frequencies:
+            frequencies[term] = sum(1 for doc_id in self.postings.get(term, ()) if doc_id <= milestone)
+        matches = frequencies[term]
+        return math.log(1 + (count - matches + 0.5) / (matches + 0.5))
+
+    def score(self, terms, doc_ids):
+        """BM25 of each document for the query terms, relative to an average-length document containing each term once (0 to 1)."""
+        terms = set(terms)
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        with self.lock:
+            _, count, average_length, _ = self._statistics()
+            if not terms or not count:
+                return scores
+            average_length = average_length or 1.0
+            norms = np.array(
+                [self.k1 * (1 - self.b + self.b * self.doc_lengths.get(doc_id, 0) / average_length) for doc_id in doc_ids],
+                dtype=np.float32,
+            )
+            bound = 0.0
+            for term in terms:
+                idf = self.idf(term)
+                bound += idf
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                tf = np.array([postings.get(doc_id, 0) for doc_id in doc_ids], dtype=np.float32)
+                scores += idf * tf * (self.k1 + 1) / (tf + norms)
+        return np.minimum(scores / bound, 1.0) if bound else scores
+
+    def contains_all(self, doc_id, terms):
+        with self.lock:
+            return bool(terms) and all(doc_id in self.postings.get(term, ()) for term in terms)
+
+cv_lexical_index = BM25Index()
+
+def ensure_indexed(cvs):
+    """Index CVs stored by another worker or before the index existed."""
+    for cv in cvs:
+        if cv["id"] not in cv_lexical_index:
+            cv_lexical_index.add(cv["id"], cv["extracted_text"])
+
+def sync_lexical_index():
+    """Index every CV stored since this process last checked, so scores use the same corpus on every worker."""
+    with cv_lexical_index.sync_lock:
+        new_ids = storage.list_cv_ids(after_id=cv_lexical_index.synced_id)
+        for start in range(0, len(new_ids), SYNC_BATCH_SIZE):
+            batch = [doc_id for doc_id in new_ids[start:start + SYNC_BATCH_SIZE] if doc_id not in cv_lexical_index]
+            ensure_indexed(storage.list_cvs_by_ids(batch).values())
+            cv_lexical_index.synced_id = new_ids[min(start + SYNC_BATCH_SIZE, len(new_ids)) - 1]
+        return len(new_ids)
+
+def lexical_corpus_version():
+    """Identifies the corpus statistics scores are computed with, after catching up with the database."""
+    sync_lexical_index()
+    return cv_lexical_index.corpus_version()
+
+def match_skills(doc_id, skills):
+    """Split job skills into (matching, missing) for one indexed CV; a skill matches when all its tokens occur."""
+    matching, missing = [], []
+    for skill in skills:
+        (matching if cv_lexical_index.contains_all(doc_id, tokenize(skill)) else missing).append(skill)
+    return matching, missing
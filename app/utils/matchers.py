@@ -0,0 +1,54 @@
+import re
+from functools import lru_cache
+
+# Header keywords in priority order; a line matching several groups belongs to the first one
+SECTION_HEADERS = (
+    ("education", ("education", "academic", "qualification")),
+    ("experience", ("experience", "work history", "employment", "projects")),
+    ("skills", ("skills", "technical skills", "abilities", "competencies")),
+    ("positions_of_responsibility", ("positions of responsibility",)),
+    ("end", ("achievements", "courses taken")),
+)
+
+# Cue words that place a line when it appears before any section header
+SECTION_CUES = (
+    ("education", ("university", "degree", "b.tech", "m.tech", "phd")),
+    ("experience", ("years", "worked at", "internship", "engineer", "developer")),
+    ("skills", ("python", "javascript", "java", "sql", "leadership", "teamwork")),
+)
+
+SKILL_SECTION_END = ("achievements", "positions of responsibility", "courses taken")
+EXPERIENCE_CUES = SECTION_CUES[1][1]
+
+def _alternation(keywords):
+    # Longest first so the regex prefers e.g. "technical skills" over "skills"
+    return "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+
+class KeywordMatcher:
+    """Substring matching of several keyword groups with a single compiled regex."""
+
+    def __init__(self, groups):
+        self.labels = [label for label, _ in groups]
+        self.regex = re.compile("|".join(f"(?P<g{i}>{_alternation(keywords)})" for i, (_, keywords) in enumerate(groups)))
+
+    def match(self, text_lower):
+        """Return the label of the highest-priority group found in the text, or None."""
+        found = [int(m.lastgroup[1:]) for m in self.regex.finditer(text_lower)]
+        return self.labels[min(found)] if found else None
+
+    def search(self, text_lower):
+        return self.regex.search(text_lower) is not None
+
+SECTION_HEADER_MATCHER = KeywordMatcher(SECTION_HEADERS)
+SECTION_CUE_MATCHER = KeywordMatcher(SECTION_CUES)
+SKILL_SECTION_END_MATCHER = KeywordMatcher((("end", SKILL_SECTION_END),))
+EXPERIENCE_CUE_MATCHER = KeywordMatcher((("experience", EXPERIENCE_CUES),))
+
+@lru_cache(maxsize=1024)
+def keyword_matcher(keywords):
+    """Compiled matcher for a job's own keywords (a tuple), shared across evaluations."""
+    return KeywordMatcher((("keyword", keywords),))
+
+def normalize_skills(skills):
+    """Lowercased job skills, in order; computed once when the job is saved."""
+    return skills.lower().split(", ")
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+import httpx
+from app.utils import storage
+from app.utils.metrics import record_cache, stage_seconds
+
+# cloudinary: the hosted Cloudinary account configured in cloudinary_config.py
+# local: files under OBJECT_STORAGE_DIR, served by the API at /files; for tests and air-gapped deployments
+OBJECT_STORAGE_BACKEND = os.getenv("OBJECT_STORAGE_BACKEND", "cloudinary")
+OBJECT_STORAGE_DIR = os.getenv("OBJECT_STORAGE_DIR", "uploads")
+OBJECT_STORAGE_BASE_URL = os.getenv("OBJECT_STORAGE_BASE_URL", "http://127.0.0.1:8000/files")
+CLOUDINARY_FOLDER = "cv_uploads"
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "3"))
+UPLOAD_BACKOFF = float(os.getenv("UPLOAD_BACKOFF", "0.5"))
+UPLOAD_TIMEOUT = float(os.getenv("UPLOAD_TIMEOUT", "60"))
+
+class CloudinaryBackend:
+    name = "cloudinary"
+
+    def __init__(self, client):
+        import cloudinary
+        import cloudinary.utils
+        import app.utils.cloudinary_config  # noqa: F401 (applies the account configuration)
+
+        self.client = client
+        self.config = cloudinary.config()
+        self.sign = cloudinary.utils.api_sign_request
+
+    async def put(self, key, content, filename):
+        params = {
+            "folder": CLOUDINARY_FOLDER,
+            "public_id": key,
+            "overwrite": "false",
+            "timestamp": int(time.time()),
+        }
+        params["signature"] = self.sign(params, self.config.api_secret)
+        params["api_key"] = self.config.api_key
+        response = await self.client.post(
+            f"https://api.cloudinary.com/v1_1/{self.config.cloud_name}/raw/upload",
+            data=params,
+            files={"file": (filename, content)},
+        )
+        response.raise_for_status()
+        return response.json()["secure_url"]
+
+class LocalBackend:
+    name = "local"
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    async def put(self, key, content, filename):
+        relative_path = f"{key[:2]}/{key}"
+        path = os.path.join(self.root, relative_path)
+        if not os.path.exists(path):
+            await asyncio.to_thread(self._write, path, content)
+        return f"{self.base_url}/{relative_path}"
+
+def _is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+class Uploader:
+    """Uploads files from any thread on one background event loop with a shared, pooled HTTP client."""
+
+    def __init__(self, backend_name):
+        self.backend_name = backend_name
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="uploader", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self.loop = loop
+
+    async def _setup(self):
+        self.semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        self.client = httpx.AsyncClient(
+            timeout=UPLOAD_TIMEOUT,
+            limits=httpx.Limits(max_connections=UPLOAD_CONCURRENCY, max_keepalive_connections=UPLOAD_CONCURRENCY),
+        )
+        if self.backend_name == "local":
+            self.backend = LocalBackend(OBJECT_STORAGE_DIR, OBJECT_STORAGE_BASE_URL)
+        elif self.backend_name == "cloudinary":
+            self.backend = CloudinaryBackend(self.client)
+        else:
+            raise ValueError(f"Unknown object storage backend: {self.backend_name}. Use cloudinary or local")
+
+    async def _upload(self, content, filename):
+        # Byte-identical files are stored once under their content hash
+        digest = hashlib.sha256(content).hexdigest()
+        key = f"{digest}{os.path.splitext(filename)[1].lower()}"
+        url = await asyncio.to_thread(storage.get_stored_file_url, digest, self.backend.name)
+        record_cache("stored_file", url is not None)
+        if url:
+            return url
+
+        async with self.semaphore:
+            with stage_seconds.time("upload"):
+                for attempt in range(UPLOAD_RETRIES + 1):
+                    try:
+                        url = await self.backend.put(key, content, filename)
+                        break
+                    except Exception as e:
+                        if attempt == UPLOAD_RETRIES or not _is_retryable(e):
+                            raise Exception(f"Error uploading to {self.backend.name}: {str(e)}")
+                        await asyncio.sleep(UPLOAD_BACKOFF * 2 ** attempt * (0.5 + random.random()))
+        await asyncio.to_thread(storage.save_stored_file, digest, self.backend.name, url, len(content))
+        return url
+
+    def submit(self, content, filename):
+        """Start an upload and return a concurrent.futures.Future resolving to the file's URL."""
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._upload(content, filename), self.loop)
+
+    def close(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
+
+uploader = Uploader(OBJECT_STORAGE_BACKEND)
+
+def submit_upload(content, filename):
+    return uploader.submit(content, filename)
@@ -0,0 +1,40 @@
+import base64
+import json
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def decode_cursor(cursor, sort="id"):
+    """A position is [last id] in id order and [last sort value, last id] otherwise."""
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    expected = 1 if sort == "id" else 2
+    if (not isinstance(position, list) or len(position) != expected
+            or not all(_is_number(value) for value in position) or not isinstance(position[-1], int)):
+        raise HTTPException(status_code=400, detail="Invalid cursor for this sort order")
+    return position
+
+def parse_fields(fields, allowed):
+    """Turn a comma-separated fields= parameter into a list of column names, or None for all columns."""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return requested
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
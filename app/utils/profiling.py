@@ -0,0 +1,66 @@
+import cProfile
+import os
+import random
+import threading
+import time
+import uuid
+
+# Requests are profiled only when enabled: those sent with "X-Profile: 1", plus a random PROFILE_SAMPLE_RATE fraction
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# cprofile writes .prof files for pstats/snakeviz; pyinstrument (optional dependency) writes HTML flame views
+PROFILER = os.getenv("PROFILER", "cprofile")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# One profiler at a time: both hook the event loop thread, and a second cProfile.enable() on it fails
+_active = threading.Lock()
+
+def should_profile(request):
+    if not PROFILING_ENABLED:
+        return False
+    return request.headers.get("x-profile") == "1" or random.random() < PROFILE_SAMPLE_RATE
+
+def _profile_path(request, extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = request.url.path.strip("/").replace("/", "_") or "root"
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{name}_{uuid.uuid4().hex[:8]}.{extension}")
+
+async def profile_request(request, call_next):
+    """Run the request under the configured profiler and name the output file in X-Profile-File.
+
+    Only work on the event loop thread is captured; thread pool and process pool work shows up as waiting.
+    cProfile also records other requests running meanwhile, pyinstrument's async mode only this one.
+    Requests arriving while another is profiled are served unprofiled.
+    """
+    if not _active.acquire(blocking=False):
+        return await call_next(request)
+    try:
+        return await _run_profiled(request, call_next)
+    finally:
+        _active.release()
+
+async def _run_profiled(request, call_next):
+    if PROFILER == "pyinstrument":
+        # Imported here so pyinstrument is only needed when it is selected
+        from pyinstrument import Profiler
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        path = _profile_path(request, "html")
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+        path = _profile_path(request, "prof")
+        profiler.dump_stats(path)
+    response.headers["X-Profile-File"] = path
+    return response
@@ -1,23 +1,42 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import logging
 import numpy as np
+import os
+from app.utils.embeddings import EMBEDDING_DIM, get_embeddings_model
+from app.utils.matchers import EXPERIENCE_CUE_MATCHER, SKILL_SECTION_END_MATCHER, keyword_matcher, normalize_skills
+from app.utils.metrics import timed
 
-# Initialize embeddings model
-try:
-    embeddings_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-except Exception as e:
-    raise Exception(f"Failed to initialize embeddings model: {str(e)}")
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+@timed("embedding")
+def embed_texts(texts, batch_size=EMBED_BATCH_SIZE):
+    """Embed texts in batches and return an (n, EMBEDDING_DIM) matrix of unit-length rows."""
+    embeddings_model = get_embeddings_model()
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings_model.embed_documents(texts[start:start + batch_size]))
+    matrix = np.array(vectors, dtype=np.float32).reshape(len(texts), EMBEDDING_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def similarity_to_score(similarity):
+    # Convert cosine similarity (-1 to 1) to a 0-100 scale
+    return np.clip((np.asarray(similarity, dtype=np.float32) + 1) * 50, 0.0, 100.0)
 
 def compute_relevance_score(job_description, cv_text):
     if not cv_text.strip() or not job_description.strip():
-        print("Debug: Empty job description or CV text")
+        logger.debug("Empty job description or CV text")
         return 0.0
     
     try:
         # Compute embeddings for job description and CV text
+        embeddings_model = get_embeddings_model()
         job_embedding = np.array(embeddings_model.embed_query(job_description), dtype=np.float32)
         cv_embedding = np.array(embeddings_model.embed_query(cv_text), dtype=np.float32)
     except Exception as e:
-        print(f"Debug: Error computing embeddings - {str(e)}")
+        logger.warning("Error computing embeddings: %s", e)
         return 0.0
     
     # Normalize embeddings
@@ -25,7 +44,7 @@ def compute_relevance_score(job_description, cv_text):
     cv_norm = np.linalg.norm(cv_embedding)
     
     if job_norm == 0 or cv_norm == 0:
-        print("Debug: Zero norm for embeddings")
+        logger.debug("Zero norm for embeddings")
         return 0.0
     
     job_embedding = job_embedding / job_norm
@@ -33,18 +52,18 @@ def compute_relevance_score(job_description, cv_text):
     
     # Compute cosine similarity (dot product of normalized vectors)
     cosine_similarity = np.dot(job_embedding, cv_embedding)
-    print(f"Debug: Cosine similarity = {cosine_similarity}")
     
     # Convert to a standard float to avoid serialization issues
     cosine_similarity = float(cosine_similarity)
     
     # Convert to a 0-100 scale (cosine similarity is between -1 and 1)
     relevance_score = (cosine_similarity + 1) * 50
-    print(f"Debug: Computed relevance score = {relevance_score}")
+    logger.debug("Cosine similarity %.4f, relevance score %.2f", cosine_similarity, relevance_score)
     
     return max(0.0, min(100.0, float(relevance_score)))
 
-def generate_feedback(job_description, cv, relevance_score):
+@timed("feedback")
+def generate_feedback(job_description, cv, relevance_score, skill_match=None):
     if not cv.get("extracted_text", "").strip():
         return "Unable to evaluate CV: No readable content found."
 
@@ -53,13 +72,18 @@ def generate_feedback(job_description, cv, relevance_score):
     cv_experience = structured_content.get("experience", [])
     cv_text = cv.get("extracted_text", "")
 
-    job_skills = job_description.get("skills", "").lower().split(", ")
+    job_skills = job_description.get("skill_set") or normalize_skills(job_description.get("skills", ""))
     job_experience = job_description.get("experience", "").lower()
 
+    if skill_match is not None:
+        # (matching, missing) job skills from the hybrid scorer, which searches the whole CV
+        matching_skills, missing_skills = skill_match
+        cv_skills = []
+
     # Clean up skills list by parsing raw strings
     cleaned_skills = []
     for skill_entry in cv_skills:
-        if any(section in skill_entry.lower() for section in ["achievements", "positions of responsibility", "courses taken"]):
+        if SKILL_SECTION_END_MATCHER.search(skill_entry.lower()):
             break
         if "•" in skill_entry:
             skill_part = skill_entry.split("•")[-1].strip()
@@ -68,20 +92,20 @@ def generate_feedback(job_description, cv, relevance_score):
 
     # Extract experience indicators
     if not cv_experience:
-        cv_text_lower = cv_text.lower()
-        potential_experience = ["years", "worked at", "internship", "engineer", "developer"]
-        found_experience = any(exp in cv_text_lower for exp in potential_experience)
+        found_experience = EXPERIENCE_CUE_MATCHER.search(cv_text.lower())
     else:
         found_experience = bool(cv_experience)
 
     # Compare skills
-    matching_skills = [skill for skill in cleaned_skills if skill.lower() in [js.lower() for js in job_skills]]
-    missing_skills = [js for js in job_skills if js.lower() not in [skill.lower() for skill in cleaned_skills]]
+    if skill_match is None:
+        job_skill_set = set(job_skills)
+        cv_skill_set = {skill.lower() for skill in cleaned_skills}
+        matching_skills = [skill for skill in cleaned_skills if skill.lower() in job_skill_set]
+        missing_skills = [js for js in job_skills if js not in cv_skill_set]
 
     # Compare experience (more flexible matching)
-    experience_keywords = job_experience.split()
-    cv_text_lower = cv_text.lower()
-    experience_match = found_experience and any(keyword in cv_text_lower for keyword in experience_keywords)
+    experience_keywords = tuple(job_experience.split())
+    experience_match = found_experience and bool(experience_keywords) and keyword_matcher(experience_keywords).search(cv_text.lower())
 
     feedback = []
     if matching_skills:
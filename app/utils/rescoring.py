@@ -0,0 +1,146 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from app.utils import storage
+from app.utils.cache import get_job_embedding, job_hash, put_evaluation, evaluation_key
+from app.utils.embeddings import model_id
+from app.utils.rag_model import generate_feedback
+from app.utils.scoring import build_job_text, score_cvs
+
+logger = logging.getLogger(__name__)
+
+RESCORE_ENABLED = os.getenv("RESCORE_ENABLED", "1") == "1"
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "50"))
+# Fraction of wall-clock time the scheduler may spend scoring; it sleeps for the rest so live requests keep priority
+RESCORE_DUTY_CYCLE = float(os.getenv("RESCORE_DUTY_CYCLE", "0.25"))
+# Seconds between checks for stale evaluations, so job edits made on any worker get re-scored
+RESCORE_POLL_INTERVAL = float(os.getenv("RESCORE_POLL_INTERVAL", "30"))
+# Only the worker holding this database lease re-scores; if it dies, another takes over once the lease lapses
+RESCORE_LEASE_SECONDS = float(os.getenv("RESCORE_LEASE_SECONDS", "300"))
+LEASE_NAME = "rescoring"
+
+def build_evaluation(job, cv, relevance_score, feedback):
+    return {
+        "username": cv["username"],
+        "filename": cv["filename"],
+        "relevance_score": relevance_score,
+        "feedback": feedback,
+        "job_title": job["jobTitle"],
+        "job_id": job["id"],
+        "job_hash": job_hash(job),
+        "model_id": model_id(),
+    }
+
+def evaluate_cvs(job, cvs):
+    """Score and write feedback for CVs against a job in one batch, caching each result."""
+    job_embedding = get_job_embedding(job, build_job_text(job))
+    evaluations = []
+    for cv, result in zip(cvs, score_cvs(job, job_embedding, cvs)):
+        feedback = generate_feedback(job, cv, result["relevance_score"], (result["matching_skills"], result["missing_skills"]))
+        put_evaluation(evaluation_key(job, cv), job, cv, {"relevance_score": result["relevance_score"], "feedback": feedback})
+        evaluations.append(build_evaluation(job, cv, result["relevance_score"], feedback))
+    return evaluations
+
+class RescoringScheduler:
+    """Background thread that re-scores evaluations made from an older job description or embedding model."""
+
+    def __init__(self, batch_size=RESCORE_BATCH_SIZE, duty_cycle=RESCORE_DUTY_CYCLE,
+                 poll_interval=RESCORE_POLL_INTERVAL, lease_seconds=RESCORE_LEASE_SECONDS):
+        self.batch_size = batch_size
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.state = {"status": "idle", "model_id": None, "total": 0, "done": 0, "failed": 0,
+                      "started_at": None, "finished_at": None, "error": None}
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="rescoring", daemon=True)
+            self.thread.start()
+        self.trigger()
+
+    def trigger(self):
+        """Look for stale evaluations now instead of at the next poll; called after a job edit or model change."""
+        self.wake.set()
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+            # Let another worker take over without waiting for the lease to lapse
+            storage.release_lease(LEASE_NAME, self.holder)
+
+    def progress(self):
+        with self.lock:
+            return {**self.state, "remaining": max(0, self.state["total"] - self.state["done"] - self.state["failed"])}
+
+    def _update(self, **values):
+        with self.lock:
+            self.state.update(values)
+
+    def _hold_lease(self):
+        return storage.acquire_lease(LEASE_NAME, self.holder, self.lease_seconds)
+
+    def _run(self):
+        while True:
+            triggered = self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            if self.stopping:
+                return
+            try:
+                # Every worker polls, but only the lease holder re-scores, so passes never overlap
+                if self._hold_lease():
+                    self._run_pass(triggered)
+            except Exception as e:
+                logger.exception("Re-scoring failed")
+                self._update(status="idle", error=str(e), finished_at=datetime.utcnow().isoformat())
+
+    def _run_pass(self, triggered=True):
+        current_model = model_id()
+        targets = [(job, job_hash(job)) for job in storage.list_jobs()]
+        total = sum(storage.count_stale_evaluations(job["id"], digest, current_model) for job, digest in targets)
+        if not total and not triggered:
+            # Nothing to do on a routine poll; keep reporting the last pass
+            return
+        self._update(status="running", model_id=current_model, total=total, done=0, failed=0,
+                     started_at=datetime.utcnow().isoformat(), finished_at=None, error=None)
+        for job, digest in targets:
+            after_id = None
+            while not self.stopping:
+                if not self._hold_lease():
+                    logger.warning("Lost the re-scoring lease; another worker continues the pass")
+                    self._update(status="idle", finished_at=datetime.utcnow().isoformat())
+                    return
+                rows = storage.list_stale_evaluations(job["id"], digest, current_model, after_id, self.batch_size)
+                if not rows:
+                    break
+                after_id = rows[-1]["id"]
+                started = time.monotonic()
+                done = self._rescore_batch(job, [row["username"] for row in rows])
+                with self.lock:
+                    self.state["done"] += done
+                    self.state["failed"] += len(rows) - done
+                # Throttle: sleep long enough that scoring uses at most duty_cycle of the time
+                time.sleep((time.monotonic() - started) * (1 / self.duty_cycle - 1))
+        self._update(status="idle", finished_at=datetime.utcnow().isoformat())
+
+    def _rescore_batch(self, job, usernames):
+        cvs = [cv for cv in storage.get_latest_cvs(job["id"], usernames).values() if cv["extracted_text"].strip()]
+        if not cvs:
+            return 0
+        evaluations = evaluate_cvs(job, cvs)
+        storage.save_evaluations(evaluations)
+        return len(evaluations)
+
+scheduler = RescoringScheduler()
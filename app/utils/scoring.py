@@ -0,0 +1,61 @@
+import os
+import numpy as np
+from app.utils.chunking import CHUNK_SCORE_POLICY, get_cv_chunk_vectors, score_cv_chunks
+from app.utils.lexical_index import cv_lexical_index, ensure_indexed, lexical_corpus_version, match_skills, sync_lexical_index, tokenize
+from app.utils.matchers import normalize_skills
+from app.utils.metrics import timed
+
+# relevance_score = weighted mean of the embedding score and the BM25 score over the job's skills
+SEMANTIC_WEIGHT = float(os.getenv("SEMANTIC_WEIGHT", "0.7"))
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0.3"))
+
+def build_job_text(job):
+    return f"{job['jobTitle']} requires skills: {job['skills']}, experience: {job['experience']}, traits: {job['traits'] or 'N/A'}"
+
+def scoring_id():
+    """Identifies the score formula, so cached scores from different weights or BM25 corpus statistics are never mixed."""
+    return f"{CHUNK_SCORE_POLICY}|{SEMANTIC_WEIGHT}:{LEXICAL_WEIGHT}|{lexical_corpus_version()}"
+
+def job_skills(job):
+    return [skill for skill in job.get("skill_set") or normalize_skills(job.get("skills", "")) if skill.strip()]
+
+def job_query_terms(job):
+    return [term for skill in job_skills(job) for term in tokenize(skill)]
+
+def lexical_scores(job, cvs):
+    """BM25 scores (0 to 100) of CVs for a job, without any embedding work."""
+    # The whole corpus, not just these CVs, has to be indexed for the statistics to match other workers
+    sync_lexical_index()
+    ensure_indexed(cvs)
+    return 100 * cv_lexical_index.score(job_query_terms(job), [cv["id"] for cv in cvs])
+
+def shortlist_cvs(job, cvs, size):
+    """The size best CVs by lexical score, to screen large pools before embedding them."""
+    if len(cvs) <= size:
+        return cvs
+    scores = lexical_scores(job, cvs)
+    return [cvs[i] for i in np.argsort(-scores, kind="stable")[:size]]
+
+@timed("scoring")
+def score_cvs(job, job_embedding, cvs, policy=CHUNK_SCORE_POLICY):
+    """Hybrid scores of CVs for a job, with the job skills each CV matches and misses."""
+    lexical = lexical_scores(job, cvs)
+    chunk_vectors = get_cv_chunk_vectors(cvs)
+    semantic = score_cv_chunks(job_embedding, [chunk_vectors[cv["id"]] for cv in cvs], policy)
+    if job_query_terms(job) and LEXICAL_WEIGHT:
+        relevance = (SEMANTIC_WEIGHT * semantic + LEXICAL_WEIGHT * lexical) / (SEMANTIC_WEIGHT + LEXICAL_WEIGHT)
+    else:
+        relevance = semantic
+
+    skills = job_skills(job)
+    results = []
+    for cv, relevance_score, semantic_score, lexical_score in zip(cvs, relevance, semantic, lexical):
+        matching, missing = match_skills(cv["id"], skills)
+        results.append({
+            "relevance_score": float(relevance_score),
+            "semantic_score": float(semantic_score),
+            "lexical_score": float(lexical_score),
+            "matching_skills": matching,
+            "missing_skills": missing,
+        })
+    return results
@@ -0,0 +1,656 @@
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import (
+    JSON, Column, Float, Index, Integer, LargeBinary, MetaData, String, Table, Text, UniqueConstraint,
+    DateTime, and_, create_engine, delete, event, exists, func, insert, inspect, or_, select, text, update
+)
+from sqlalchemy.exc import IntegrityError
+from app.utils.metrics import stage_seconds
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///cvalign.db")
+
+# Legacy JSON files, imported once into an empty database
+USERS_FILE = "users.json"
+JOB_FILE = "job_descriptions.json"
+CV_FILE = "cvs.json"
+EVALUATION_FILE = "evaluations.json"
+
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stage_seconds.observe(elapsed, "storage_read" if statement.lstrip()[:6].upper() == "SELECT" else "storage_write")
+
+@event.listens_for(engine, "handle_error")
+def _discard_query_timer(context):
+    # after_cursor_execute never runs for a failed statement
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String, nullable=False, unique=True, index=True),
+    Column("hashed_password", String, nullable=False),
+    Column("role", String, nullable=False),
+)
+
+# Job ids are explicit and start at 0 so they match the ids the API has always exposed
+jobs = Table(
+    "jobs", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("job_title", String, nullable=False),
+    Column("skills", Text, nullable=False),
+    Column("experience", Text, nullable=False),
+    Column("traits", Text),
+    Column("created_by", String, index=True),
+    Column("skill_set", JSON),
+)
+
+cvs = Table(
+    "cvs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String, nullable=False, index=True),
+    Column("filename", String, nullable=False),
+    Column("cloud_url", String),
+    Column("extracted_text", Text, nullable=False),
+    Column("structured_content", JSON),
+    Column("job_id", Integer, index=True),
+    Column("job_title", String),
+    # sha256 of the uploaded bytes; text and structure of such CVs live once in cv_contents
+    Column("content_hash", String, index=True),
+)
+
+# Extracted text and structure shared by every upload of the same file
+cv_contents = Table(
+    "cv_contents", metadata,
+    Column("content_hash", String, primary_key=True),
+    Column("extracted_text", Text, nullable=False),
+    Column("structured_content", JSON),
+)
+
+# Per-chunk embeddings of a CV, stored as raw float32 bytes with the model that produced them
+cv_chunks = Table(
+    "cv_chunks", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("cv_id", Integer, nullable=False, index=True),
+    Column("section", String, nullable=False),
+    Column("text", Text, nullable=False),
+    Column("vector", LargeBinary, nullable=False),
+    Column("model_id", String),
+)
+
+# Chunk embeddings of a cv_contents entry, shared by all its uploads
+content_chunks = Table(
+    "content_chunks", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("content_hash", String, nullable=False, index=True),
+    Column("section", String, nullable=False),
+    Column("text", Text, nullable=False),
+    Column("vector", LargeBinary, nullable=False),
+    Column("model_id", String),
+)
+
+evaluations = Table(
+    "evaluations", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String, nullable=False, index=True),
+    Column("filename", String),
+    Column("relevance_score", Float),
+    Column("feedback", Text),
+    Column("job_title", String),
+    Column("job_id", Integer, index=True),
+    # What the score was computed from, so stale evaluations can be found and re-scored
+    Column("job_hash", String),
+    Column("model_id", String),
+    UniqueConstraint("username", "job_id"),
+    Index("ix_evaluations_job_score", "job_id", "relevance_score"),
+    Index("ix_evaluations_score", "relevance_score"),
+)
+
+# CVs as the API sees them: deduplicated uploads read their text and structure from cv_contents
+cv_records = select(*[
+    func.coalesce(cv_contents.c[column.name], column).label(column.name)
+    if column.name in ("extracted_text", "structured_content") else column
+    for column in cvs.columns
+]).select_from(cvs.outerjoin(cv_contents, cvs.c.content_hash == cv_contents.c.content_hash)).subquery("cv_records")
+
+CV_FIELDS = [column.name for column in cvs.columns]
+EVALUATION_FIELDS = [column.name for column in evaluations.columns]
+
+# Optional on-disk copy of the evaluation cache, keyed by content hashes
+evaluation_cache = Table(
+    "evaluation_cache", metadata,
+    Column("key", String, primary_key=True),
+    Column("job_id", Integer, index=True),
+    Column("username", String),
+    Column("value", JSON, nullable=False),
+)
+
+# Uploaded files by content hash, so identical bytes are stored once per backend
+stored_files = Table(
+    "stored_files", metadata,
+    Column("content_hash", String, primary_key=True),
+    Column("backend", String, primary_key=True),
+    Column("url", String, nullable=False),
+    Column("size", Integer),
+)
+
+# Background CV ingestion requests and the stage each one has reached
+ingestions = Table(
+    "ingestions", metadata,
+    Column("id", String, primary_key=True),
+    Column("username", String, nullable=False, index=True),
+    Column("filename", String, nullable=False),
+    Column("job_id", Integer),
+    Column("status", String, nullable=False),
+    Column("error", Text),
+    Column("cv_id", Integer),
+    Column("cloud_url", String),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+# Named leases held by one worker process at a time, e.g. the re-scoring runner
+leases = Table(
+    "leases", metadata,
+    Column("name", String, primary_key=True),
+    Column("holder", String, nullable=False),
+    Column("expires_at", Float, nullable=False),
+)
+
+def _job_to_dict(row):
+    return {
+        "id": row.id,
+        "jobTitle": row.job_title,
+        "skills": row.skills,
+        "experience": row.experience,
+        "traits": row.traits,
+        "created_by": row.created_by,
+        "skill_set": row.skill_set,
+    }
+
+def _to_job_id(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def init_db():
+    metadata.create_all(engine)
+    upgrade_schema()
+    migrate_json_files()
+
+def upgrade_schema():
+    # create_all() only creates missing tables, so columns and indexes added later are created here
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            present = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def migrate_json_files():
+    def read(path):
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return []
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(users)).scalar() == 0:
+            rows = [{k: u[k] for k in ("username", "hashed_password", "role")} for u in read(USERS_FILE)]
+            if rows:
+                conn.execute(insert(users), rows)
+        if conn.execute(select(func.count()).select_from(jobs)).scalar() == 0:
+            rows = [
+                {
+                    "id": idx,
+                    "job_title": job["jobTitle"],
+                    "skills": job["skills"],
+                    "experience": job["experience"],
+                    "traits": job.get("traits"),
+                    "created_by": job.get("created_by"),
+                }
+                for idx, job in enumerate(read(JOB_FILE))
+            ]
+            if rows:
+                conn.execute(insert(jobs), rows)
+        if conn.execute(select(func.count()).select_from(cvs)).scalar() == 0:
+            rows = [
+                {
+                    "username": cv["username"],
+                    "filename": cv["filename"],
+                    "cloud_url": cv.get("cloud_url"),
+                    "extracted_text": cv.get("extracted_text", ""),
+                    "structured_content": cv.get("structured_content"),
+                    "job_id": _to_job_id(cv.get("job_id")),
+                    "job_title": cv.get("job_title"),
+                }
+                for cv in read(CV_FILE)
+            ]
+            if rows:
+                conn.execute(insert(cvs), rows)
+        if conn.execute(select(func.count()).select_from(evaluations)).scalar() == 0:
+            latest = {}
+            for evaluation in read(EVALUATION_FILE):
+                key = (evaluation["username"], _to_job_id(evaluation.get("job_id")))
+                latest[key] = {**evaluation, "job_id": key[1]}
+            rows = [
+                {k: e.get(k) for k in ("username", "filename", "relevance_score", "feedback", "job_title", "job_id")}
+                for e in latest.values()
+            ]
+            if rows:
+                conn.execute(insert(evaluations), rows)
+
+# Users
+
+# Users are never updated or deleted, so found rows can be kept in memory for the life of the process.
+# Misses always go to the database, so users registered through another worker are still found.
+_users_by_name = {}
+
+def get_user(username):
+    user = _users_by_name.get(username)
+    if user is not None:
+        return dict(user)
+    with engine.connect() as conn:
+        row = conn.execute(select(users).where(users.c.username == username)).first()
+    if row is None:
+        return None
+    _users_by_name[username] = dict(row._mapping)
+    return dict(row._mapping)
+
+def add_user(user_data):
+    with engine.begin() as conn:
+        result = conn.execute(insert(users).values(**user_data))
+    _users_by_name[user_data["username"]] = {**user_data, "id": result.inserted_primary_key[0]}
+
+# Job descriptions
+
+def list_jobs(created_by=None):
+    query = select(jobs).order_by(jobs.c.id)
+    if created_by is not None:
+        query = query.where(jobs.c.created_by == created_by)
+    with engine.connect() as conn:
+        return [_job_to_dict(row) for row in conn.execute(query)]
+
+def get_job(job_id):
+    with engine.connect() as conn:
+        row = conn.execute(select(jobs).where(jobs.c.id == job_id)).first()
+    return _job_to_dict(row) if row else None
+
+def list_jobs_by_ids(job_ids):
+    with engine.connect() as conn:
+        rows = conn.execute(select(jobs).where(jobs.c.id.in_(job_ids)))
+        return {row.id: _job_to_dict(row) for row in rows}
+
+def get_job_ids(created_by):
+    with engine.connect() as conn:
+        return [row.id for row in conn.execute(select(jobs.c.id).where(jobs.c.created_by == created_by))]
+
+def add_job(job_data):
+    # Ids continue from the largest one (legacy ids start at 0); computing it inside the INSERT makes SQLite
+    # take its write lock before reading, so concurrent creations can't pick the same id
+    next_id = select(func.coalesce(func.max(jobs.c.id) + 1, 0)).scalar_subquery()
+    with engine.begin() as conn:
+        result = conn.execute(insert(jobs).values(
+            id=next_id,
+            job_title=job_data["jobTitle"],
+            skills=job_data["skills"],
+            experience=job_data["experience"],
+            traits=job_data.get("traits"),
+            created_by=job_data.get("created_by"),
+            skill_set=job_data.get("skill_set"),
+        ))
+    return result.lastrowid
+
+def update_job(job_id, job_data):
+    with engine.begin() as conn:
+        conn.execute(update(jobs).where(jobs.c.id == job_id).values(
+            job_title=job_data["jobTitle"],
+            skills=job_data["skills"],
+            experience=job_data["experience"],
+            traits=job_data.get("traits"),
+            skill_set=job_data.get("skill_set"),
+        ))
+        conn.execute(update(cvs).where(cvs.c.job_id == job_id).values(job_title=job_data["jobTitle"]))
+
+# CVs
+
+def add_cv(cv_data):
+    with engine.begin() as conn:
+        result = conn.execute(insert(cvs).values(**cv_data))
+    return result.inserted_primary_key[0]
+
+def add_cvs_with_contents(contents, cv_rows, model_id):
+    """Insert (content_hash, text, structured_content, chunks, matrix) contents not stored yet and the CV rows
+    referencing them in one transaction; returns the new CV ids. Chunk vectors are tagged with model_id."""
+    with engine.begin() as conn:
+        hashes = [content[0] for content in contents]
+        stored = set(conn.execute(select(cv_contents.c.content_hash).where(cv_contents.c.content_hash.in_(hashes))).scalars())
+        for content_hash, extracted_text, structured_content, chunks, matrix in contents:
+            if content_hash in stored:
+                continue
+            conn.execute(insert(cv_contents).values(
+                content_hash=content_hash, extracted_text=extracted_text, structured_content=structured_content,
+            ))
+            rows = _chunk_rows(chunks, matrix, content_hash=content_hash, model_id=model_id)
+            if rows:
+                conn.execute(insert(content_chunks), rows)
+        return [conn.execute(insert(cvs).values(**cv_data)).inserted_primary_key[0] for cv_data in cv_rows]
+
+def get_cv_contents(content_hashes):
+    """Return {content_hash: (extracted_text, structured_content)} for the hashes already stored."""
+    query = select(cv_contents).where(cv_contents.c.content_hash.in_(content_hashes))
+    with engine.connect() as conn:
+        return {row.content_hash: (row.extracted_text, row.structured_content) for row in conn.execute(query)}
+
+def save_cv_content(content_hash, extracted_text, structured_content):
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(cv_contents).values(
+                content_hash=content_hash, extracted_text=extracted_text, structured_content=structured_content,
+            ))
+    except IntegrityError:
+        # The same file finished extracting in a concurrent upload first; both results are identical
+        pass
+
+def get_cv(username, job_id):
+    # The most recent upload replaces earlier ones for the same job
+    query = select(cv_records).where(cv_records.c.username == username, cv_records.c.job_id == job_id) \
+        .order_by(cv_records.c.id.desc()).limit(1)
+    with engine.connect() as conn:
+        row = conn.execute(query).first()
+    return dict(row._mapping) if row else None
+
+def get_latest_cvs(job_id, usernames):
+    """Return {username: latest CV} for the given users' uploads to a job."""
+    query = select(cv_records).where(cv_records.c.job_id == job_id, cv_records.c.username.in_(usernames)) \
+        .order_by(cv_records.c.id)
+    with engine.connect() as conn:
+        return {row.username: dict(row._mapping) for row in conn.execute(query)}
+
+def get_cv_by_id(cv_id):
+    with engine.connect() as conn:
+        row = conn.execute(select(cv_records).where(cv_records.c.id == cv_id)).first()
+    return dict(row._mapping) if row else None
+
+def list_cvs_by_ids(cv_ids, latest_only=False):
+    query = select(cv_records).where(cv_records.c.id.in_(cv_ids))
+    if latest_only:
+        query = query.where(~_superseded())
+    with engine.connect() as conn:
+        rows = conn.execute(query)
+        return {row.id: dict(row._mapping) for row in rows}
+
+def _superseded():
+    # The most recent upload replaces earlier ones for the same job
+    later = cvs.alias("later")
+    return exists().where(
+        later.c.username == cv_records.c.username,
+        later.c.job_id.is_not_distinct_from(cv_records.c.job_id),
+        later.c.id > cv_records.c.id,
+    )
+
+def list_cv_ids(after_id=0):
+    with engine.connect() as conn:
+        return [row.id for row in conn.execute(select(cvs.c.id).where(cvs.c.id > after_id).order_by(cvs.c.id))]
+
+def list_cvs(job_ids=None, latest_only=False):
+    query = select(cv_records).order_by(cv_records.c.id)
+    if job_ids is not None:
+        query = query.where(cv_records.c.job_id.in_(job_ids))
+    if latest_only:
+        query = query.where(~_superseded())
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(query)]
+
+def update_cv(cv_id, **values):
+    with engine.begin() as conn:
+        conn.execute(update(cvs).where(cvs.c.id == cv_id).values(**values))
+
+def update_cv_structured_content(cv_id, structured_content):
+    update_cv(cv_id, structured_content=structured_content)
+
+def _chunk_rows(chunks, matrix, **key):
+    return [
+        {
+            **key,
+            "section": chunk["section"],
+            "text": chunk["text"],
+            "vector": np.asarray(vector, dtype=np.float32).tobytes(),
+        }
+        for chunk, vector in zip(chunks, matrix)
+    ]
+
+def save_cv_chunks(cv, chunks, matrix, model_id):
+    """Store chunk vectors once per content for deduplicated CVs, per CV otherwise, replacing any from other models."""
+    if cv.get("content_hash"):
+        table, name, value = content_chunks, "content_hash", cv["content_hash"]
+    else:
+        table, name, value = cv_chunks, "cv_id", cv["id"]
+    rows = _chunk_rows(chunks, matrix, model_id=model_id, **{name: value})
+    with engine.begin() as conn:
+        conn.execute(delete(table).where(table.c[name] == value))
+        if rows:
+            conn.execute(insert(table), rows)
+
+def _group_chunks(rows):
+    grouped = {}
+    for key, section, vector in rows:
+        sections, vectors = grouped.setdefault(key, ([], []))
+        sections.append(section)
+        vectors.append(np.frombuffer(vector, dtype=np.float32))
+    return {key: (sections, np.vstack(vectors)) for key, (sections, vectors) in grouped.items()}
+
+def get_cv_chunks(cvs_list, model_id):
+    """Return {cv_id: (sections, matrix)} for the given CVs that have chunks cached from model_id."""
+    by_hash = {}
+    cv_ids = []
+    for cv in cvs_list:
+        if cv.get("content_hash"):
+            by_hash.setdefault(cv["content_hash"], []).append(cv["id"])
+        else:
+            cv_ids.append(cv["id"])
+    with engine.connect() as conn:
+        chunks = _group_chunks(conn.execute(
+            select(cv_chunks.c.cv_id, cv_chunks.c.section, cv_chunks.c.vector)
+            .where(cv_chunks.c.cv_id.in_(cv_ids), cv_chunks.c.model_id == model_id).order_by(cv_chunks.c.id)
+        ))
+        shared = _group_chunks(conn.execute(
+            select(content_chunks.c.content_hash, content_chunks.c.section, content_chunks.c.vector)
+            .where(content_chunks.c.content_hash.in_(list(by_hash)), content_chunks.c.model_id == model_id)
+            .order_by(content_chunks.c.id)
+        ))
+    for content_hash, value in shared.items():
+        for cv_id in by_hash[content_hash]:
+            chunks[cv_id] = value
+    return chunks
+
+# Evaluations
+
+def get_evaluation(username, job_id):
+    with engine.connect() as conn:
+        row = conn.execute(select(evaluations).where(
+            evaluations.c.username == username, evaluations.c.job_id == job_id,
+        )).mappings().first()
+    return dict(row) if row else None
+
+def save_evaluation(evaluation):
+    save_evaluations([evaluation])
+
+def save_evaluations(evaluation_list):
+    # Replace any previous evaluation of the same CV for the same job, keeping its id (and place in listings)
+    with engine.begin() as conn:
+        for evaluation in evaluation_list:
+            result = conn.execute(update(evaluations).where(
+                evaluations.c.username == evaluation["username"],
+                evaluations.c.job_id == evaluation["job_id"],
+            ).values(**evaluation))
+            if result.rowcount == 0:
+                conn.execute(insert(evaluations).values(**evaluation))
+
+def _stale_evaluations(job_id, job_hash, model_id):
+    return and_(
+        evaluations.c.job_id == job_id,
+        or_(
+            evaluations.c.job_hash.is_(None),
+            evaluations.c.job_hash != job_hash,
+            evaluations.c.model_id.is_(None),
+            evaluations.c.model_id != model_id,
+        ),
+    )
+
+def count_stale_evaluations(job_id, job_hash, model_id):
+    query = select(func.count()).select_from(evaluations).where(_stale_evaluations(job_id, job_hash, model_id))
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+def list_stale_evaluations(job_id, job_hash, model_id, after_id=None, limit=100):
+    """Evaluations of a job scored from other job content or another model, by id."""
+    query = select(evaluations.c.id, evaluations.c.username).where(_stale_evaluations(job_id, job_hash, model_id))
+    if after_id is not None:
+        query = query.where(evaluations.c.id > after_id)
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(query.order_by(evaluations.c.id).limit(limit))]
+
+# Evaluation cache
+
+def get_cached_evaluation(key):
+    with engine.connect() as conn:
+        return conn.execute(select(evaluation_cache.c.value).where(evaluation_cache.c.key == key)).scalar()
+
+def put_cached_evaluation(key, job_id, username, value):
+    with engine.begin() as conn:
+        conn.execute(delete(evaluation_cache).where(evaluation_cache.c.key == key))
+        conn.execute(insert(evaluation_cache).values(key=key, job_id=job_id, username=username, value=value))
+
+def delete_cached_evaluations(job_id, username=None):
+    query = delete(evaluation_cache).where(evaluation_cache.c.job_id == job_id)
+    if username is not None:
+        query = query.where(evaluation_cache.c.username == username)
+    with engine.begin() as conn:
+        conn.execute(query)
+
+# Paginated listings
+
+def _list_page(table, fields=None, job_ids=None, after=None, limit=100, sort="id"):
+    """One page of rows in keyset order; returns (rows, position after the last row or None)."""
+    sort_columns = ["id"] if sort == "id" else [sort, "id"]
+    names = list(dict.fromkeys((fields or [column.name for column in table.columns]) + sort_columns))
+    query = select(*[table.c[name] for name in names])
+    if job_ids is not None:
+        query = query.where(table.c.job_id.in_(job_ids))
+    if sort == "id":
+        if after:
+            query = query.where(table.c.id > after[0])
+        query = query.order_by(table.c.id)
+    else:
+        # Highest first, ties broken by id so the order is stable across pages
+        if after:
+            value, last_id = after
+            query = query.where(or_(table.c[sort] < value, and_(table.c[sort] == value, table.c.id < last_id)))
+        query = query.order_by(table.c[sort].desc(), table.c.id.desc())
+
+    with engine.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(query.limit(limit + 1))]
+    position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        position = [rows[-1][name] for name in sort_columns]
+    return rows, position
+
+def _iter_rows(table, fields=None, job_ids=None, sort="id", batch_size=500):
+    position = None
+    while True:
+        rows, position = _list_page(table, fields, job_ids, position, batch_size, sort)
+        yield from rows
+        if position is None:
+            return
+
+def list_cvs_page(fields=None, job_ids=None, after=None, limit=100):
+    return _list_page(cv_records, fields, job_ids, after, limit)
+
+def iter_cvs(fields=None, job_ids=None):
+    return _iter_rows(cv_records, fields, job_ids)
+
+def list_evaluations_page(fields=None, job_ids=None, after=None, limit=100, sort="id"):
+    return _list_page(evaluations, fields, job_ids, after, limit, sort)
+
+def iter_evaluations(fields=None, job_ids=None, sort="id"):
+    return _iter_rows(evaluations, fields, job_ids, sort)
+
+# Stored files
+
+def get_stored_file_url(content_hash, backend):
+    query = select(stored_files.c.url).where(stored_files.c.content_hash == content_hash, stored_files.c.backend == backend)
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+def save_stored_file(content_hash, backend, url, size):
+    with engine.begin() as conn:
+        conn.execute(delete(stored_files).where(stored_files.c.content_hash == content_hash, stored_files.c.backend == backend))
+        conn.execute(insert(stored_files).values(content_hash=content_hash, backend=backend, url=url, size=size))
+
+# Ingestions
+
+def create_ingestion(ingestion):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(ingestions).values(**ingestion, created_at=now, updated_at=now))
+
+def update_ingestion(ingestion_id, **values):
+    with engine.begin() as conn:
+        conn.execute(update(ingestions).where(ingestions.c.id == ingestion_id).values(**values, updated_at=datetime.utcnow()))
+
+def get_ingestion(ingestion_id):
+    with engine.connect() as conn:
+        row = conn.execute(select(ingestions).where(ingestions.c.id == ingestion_id)).first()
+    return dict(row._mapping) if row else None
+
+# Leases
+
+def acquire_lease(name, holder, ttl):
+    """Take or renew a lease for ttl seconds; False while another holder's lease has not expired."""
+    now = time.time()
+    try:
+        with engine.begin() as conn:
+            result = conn.execute(update(leases).where(
+                leases.c.name == name,
+                or_(leases.c.holder == holder, leases.c.expires_at < now),
+            ).values(holder=holder, expires_at=now + ttl))
+            if result.rowcount:
+                return True
+            if conn.execute(select(leases.c.name).where(leases.c.name == name)).first():
+                return False
+            conn.execute(insert(leases).values(name=name, holder=holder, expires_at=now + ttl))
+    except IntegrityError:
+        # Another worker created the lease first
+        return False
+    return True
+
+def release_lease(name, holder):
+    with engine.begin() as conn:
+        conn.execute(delete(leases).where(leases.c.name == name, leases.c.holder == holder))
@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+from app.utils import storage
+from app.utils.embeddings import MODEL_NAME, model_id
+from app.utils.metrics import record_cache
+from app.utils.rag_model import EMBEDDING_DIM, embed_texts
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so run a single worker
+    fcntl = None
+
+# Whole-CV vectors keyed by the sha256 of the CV text, in files every worker maps read-only, one set per embedding model:
+#   <path>.<model>.<dtype>[.<generation>].keys     64-byte hex keys, one per row, append-only
+#   <path>.<model>.<dtype>[.<generation>].vectors  the (rows, EMBEDDING_DIM) matrix, append-only
+#   <path>.<model>.<dtype>[.<generation>].scales   per-row float32 scales (int8 only)
+#   <path>.<model>.<dtype>.current                 the generation in use; compaction writes the next one
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "cv_vectors")
+# float32, or float16 / int8 for a half / quarter of the memory at a small loss of precision
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")
+# Compact when more than this fraction of rows belongs to no stored CV
+VECTOR_STORE_COMPACT_RATIO = float(os.getenv("VECTOR_STORE_COMPACT_RATIO", "0.25"))
+# Seconds between checks for stale rows in a running server; 0 checks only at startup
+VECTOR_STORE_COMPACT_INTERVAL = float(os.getenv("VECTOR_STORE_COMPACT_INTERVAL", "3600"))
+LEGACY_VECTOR_FILE = "cv_vectors.npz"
+# cv_vectors.npz predates selectable backends, so its vectors all came from the default torch model
+LEGACY_MODEL_ID = f"{MODEL_NAME}@torch"
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+KEY_BYTES = 64
+
+logger = logging.getLogger(__name__)
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class VectorStore:
+    """Append-only, memory-mapped matrix of unit vectors with a key-to-row map."""
+
+    def __init__(self, path, dim=EMBEDDING_DIM, dtype=VECTOR_STORE_DTYPE):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector store dtype: {dtype}. Use one of {', '.join(DTYPES)}")
+        self.dim = dim
+        self.dtype = dtype
+        self.storage_dtype = np.dtype(DTYPES[dtype])
+        self.base_path = f"{path}.{dtype}"
+        self.manifest_path = f"{self.base_path}.current"
+        self.lock_path = f"{self.base_path}.lock"
+        self.lock = threading.Lock()
+        self.generation = None
+        self._reset()
+        with self._file_lock(exclusive=False):
+            self._refresh()
+
+    def _reset(self):
+        self.rows = {}
+        self.keys = []
+        self.vectors = np.zeros((0, self.dim), dtype=self.storage_dtype)
+        self.scales = None
+
+    def _paths(self, generation):
+        # Generation 0 is the unnumbered set of files written before the first compaction
+        prefix = self.base_path if generation == 0 else f"{self.base_path}.{generation}"
+        return f"{prefix}.keys", f"{prefix}.vectors", f"{prefix}.scales"
+
+    def _current_generation(self):
+        try:
+            with open(self.manifest_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Pick up rows appended by other processes, or switch to the files of a compaction."""
+        generation = self._current_generation()
+        if generation != self.generation:
+            self._reset()
+            self.generation = generation
+            self.keys_path, self.vectors_path, self.scales_path = self._paths(generation)
+        if not os.path.exists(self.keys_path):
+            self._reset()
+            return
+        count = os.path.getsize(self.keys_path) // KEY_BYTES
+        if count == len(self.keys):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(len(self.keys) * KEY_BYTES)
+            data = f.read((count - len(self.keys)) * KEY_BYTES)
+        for start in range(0, len(data), KEY_BYTES):
+            key = data[start:start + KEY_BYTES].decode("ascii")
+            self.rows[key] = len(self.keys)
+            self.keys.append(key)
+        self.vectors = np.memmap(self.vectors_path, dtype=self.storage_dtype, mode="r", shape=(count, self.dim))
+        if self.dtype == "int8":
+            self.scales = np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(count,))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def _encode(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dim)
+        if self.dtype != "int8":
+            return matrix.astype(self.storage_dtype), None
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _decode(self, rows):
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def missing(self, keys):
+        with self.lock:
+            if any(key not in self.rows for key in keys):
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+            return [key for key in keys if key not in self.rows]
+
+    def get(self, keys):
+        """Return a float32 (len(keys), dim) matrix; raises KeyError for keys not stored."""
+        with self.lock:
+            if any(key not in self.rows for key in keys):
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+            rows = [self.rows[key] for key in keys]
+            if not rows:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            return self._decode(rows)
+
+    def add(self, keys, matrix):
+        encoded, scales = self._encode(matrix)
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            new = {}
+            for position, key in enumerate(keys):
+                if key not in self.rows and key not in new:
+                    new[key] = position
+            if not new:
+                return
+            positions = list(new.values())
+            count = len(self.keys)
+            # Anything past the last complete row is a write interrupted by a crash; overwrite it
+            self._append(self.vectors_path, count * self.dim * self.storage_dtype.itemsize, encoded[positions].tobytes())
+            if scales is not None:
+                self._append(self.scales_path, count * 4, scales[positions].tobytes())
+            # Keys last: a row exists for readers only once its key is written
+            self._append(self.keys_path, count * KEY_BYTES, "".join(new).encode("ascii"))
+            self._refresh()
+
+    @staticmethod
+    def _append(path, offset, data):
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def compact(self, live_keys):
+        """Write the rows of live_keys, in row order, as a new generation; readers switch over on their next refresh."""
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            rows = [row for row, key in enumerate(self.keys) if key in live_keys]
+            if len(rows) == len(self.keys):
+                return 0
+            removed = len(self.keys) - len(rows)
+            previous = self._paths(self.generation)
+            generation = self.generation + 1
+            keys_path, vectors_path, scales_path = self._paths(generation)
+            # The new files are complete on disk before the manifest names them, so a crash at any
+            # point leaves a consistent generation in use; a half-written next one is overwritten later
+            self._write(vectors_path, np.asarray(self.vectors[rows]).tobytes())
+            if self.scales is not None:
+                self._write(scales_path, np.asarray(self.scales[rows]).tobytes())
+            self._write(keys_path, "".join(self.keys[row] for row in rows).encode("ascii"))
+            self._write(self.manifest_path + ".tmp", str(generation).encode("ascii"))
+            os.replace(self.manifest_path + ".tmp", self.manifest_path)
+            self._refresh()
+            for path in previous:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError:  # Still mapped on Windows; left behind
+                    logger.warning("Could not remove %s after compaction", path)
+            return removed
+
+    @staticmethod
+    def _write(path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def _migrate_legacy_store(store):
+    # Vectors from the former cv_vectors.npz store are copied over once instead of being re-embedded
+    if len(store) or not os.path.exists(LEGACY_VECTOR_FILE):
+        return
+    with np.load(LEGACY_VECTOR_FILE) as data:
+        store.add(data["hashes"].tolist(), data["vectors"])
+    os.replace(LEGACY_VECTOR_FILE, LEGACY_VECTOR_FILE + ".migrated")
+
+def get_cv_vector_store():
+    """The store of the current embedding model; vectors of different models never share files."""
+    current = model_id()
+    with _stores_lock:
+        store = _stores.get(current)
+        if store is None:
+            store = _stores[current] = VectorStore(f"{VECTOR_STORE_PATH}.{re.sub(r'[^A-Za-z0-9_.-]+', '_', current)}")
+            if current == LEGACY_MODEL_ID:
+                _migrate_legacy_store(store)
+        return store
+
+def get_cv_vectors(cv_texts):
+    """Return the normalized vector of every CV text, embedding only those not stored yet."""
+    cv_vector_store = get_cv_vector_store()
+    text_hashes = [content_hash(text) for text in cv_texts]
+    missing = {}
+    for text_hash, text in zip(text_hashes, cv_texts):
+        if text_hash not in cv_vector_store and text_hash not in missing:
+            missing[text_hash] = text
+    if missing:
+        missing = {text_hash: missing[text_hash] for text_hash in cv_vector_store.missing(list(missing))}
+    record_cache("cv_vector", False, len(missing))
+    record_cache("cv_vector", True, len(text_hashes) - len(missing))
+    if missing:
+        cv_vector_store.add(list(missing), embed_texts(list(missing.values())))
+    return cv_vector_store.get(text_hashes)
+
+def compact_cv_vectors(cv_texts):
+    """Drop vectors of texts no stored CV has any more, once enough of them pile up."""
+    cv_vector_store = get_cv_vector_store()
+    live = {content_hash(text) for text in cv_texts}
+    stale = len(cv_vector_store) - len(live & set(cv_vector_store.keys))
+    if stale and stale > VECTOR_STORE_COMPACT_RATIO * len(cv_vector_store):
+        return cv_vector_store.compact(live)
+    return 0
+
+def compact_stored_cv_vectors():
+    # Texts are streamed in pages, so only their hashes are held in memory
+    removed = compact_cv_vectors(cv["extracted_text"] for cv in storage.iter_cvs(["extracted_text"]))
+    if removed:
+        logger.info("Compacted the CV vector store: %d stale rows removed", removed)
+    return removed
+
+_compaction_stop = threading.Event()
+_compaction_thread = None
+
+def _compact_periodically(interval):
+    while not _compaction_stop.wait(interval):
+        try:
+            compact_stored_cv_vectors()
+        except Exception:
+            logger.exception("CV vector store compaction failed")
+
+def start_compaction(interval=VECTOR_STORE_COMPACT_INTERVAL):
+    global _compaction_thread
+    if interval > 0 and _compaction_thread is None:
+        _compaction_stop.clear()
+        _compaction_thread = threading.Thread(target=_compact_periodically, args=(interval,), name="vector-compaction", daemon=True)
+        _compaction_thread.start()
+
+def stop_compaction():
+    global _compaction_thread
+    _compaction_stop.set()
+    if _compaction_thread is not None:
+        _compaction_thread.join()
+        _compaction_thread = None
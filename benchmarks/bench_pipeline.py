@@ -0,0 +1,249 @@
+"""Stage-by-stage throughput and latency benchmark of the CV scoring pipeline.
+
+Runs offline on synthetic PDF/DOCX CVs against a throwaway database, with uploads
+going to the local object storage backend. Results are written as JSON so runs from different commits
+can be compared:
+
+    python -m benchmarks.bench_pipeline --cvs 200 --output before.json
+    python -m benchmarks.bench_pipeline --cvs 200 --output after.json --compare before.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.synthetic import generate_cv_files, generate_job
+
+EMBED_BATCH_SIZES = (1, 8, 32, 64, 128)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies, items=None):
+    """Latencies are per call in seconds; items is the number of documents processed, if not one per call."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    items = len(ordered) if items is None else items
+    return {
+        "calls": len(ordered),
+        "items": items,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(items / total, 3) if total else None,
+        "mean_ms": round(1000 * total / len(ordered), 3) if ordered else None,
+        "p50_ms": round(1000 * percentile(ordered, 0.50), 3),
+        "p99_ms": round(1000 * percentile(ordered, 0.99), 3),
+    }
+
+def timed(fn, inputs):
+    latencies = []
+    results = []
+    for item in inputs:
+        start = time.perf_counter()
+        results.append(fn(item))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def bench_stages(files, jobs, results):
+    from app.main import build_job_text
+    from app.utils.chunking import chunk_cv, get_cv_chunk_vectors, score_cv_chunks
+    from app.utils.cv_parser import extract_text_from_docx, extract_text_from_pdf, structure_cv_content
+    from app.utils.extraction import extract_cv_text
+    from app.utils.rag_model import compute_relevance_score, embed_texts, generate_feedback
+    from app.utils.scoring import lexical_scores, score_cvs
+    from app.utils import storage
+
+    pdfs = [content for name, content, _ in files if name.endswith(".pdf")]
+    docxs = [content for name, content, _ in files if name.endswith(".docx")]
+    latencies, _ = timed(lambda content: extract_text_from_pdf(io.BytesIO(content)), pdfs)
+    results["extract_text_from_pdf"] = summarize(latencies)
+    latencies, _ = timed(lambda content: extract_text_from_docx(io.BytesIO(content)), docxs)
+    results["extract_text_from_docx"] = summarize(latencies)
+    latencies, _ = timed(lambda f: extract_cv_text(f[1], f[0]), files)
+    results["extraction_service"] = summarize(latencies)
+
+    texts = [text for _, _, text in files]
+    latencies, structured = timed(structure_cv_content, texts)
+    results["structure_cv_content"] = summarize(latencies)
+
+    chunk_texts = [chunk["text"] for text, content in zip(texts, structured) for chunk in chunk_cv(text, content)]
+    embed_texts(chunk_texts[:8])  # warm-up
+    for batch_size in EMBED_BATCH_SIZES:
+        batches = [chunk_texts[i:i + batch_size] for i in range(0, len(chunk_texts), batch_size)]
+        latencies, _ = timed(lambda batch: embed_texts(batch, batch_size=batch_size), batches)
+        results[f"embed_batch_{batch_size}"] = summarize(latencies, items=len(chunk_texts))
+
+    job = {**jobs[0], "id": 0}
+    job_text = build_job_text(job)
+    pairs = texts[:50]
+    latencies, scores = timed(lambda text: compute_relevance_score(job_text, text), pairs)
+    results["compute_relevance_score"] = summarize(latencies)
+
+    cvs = []
+    for text, content in zip(texts, structured):
+        cv = {"username": "bench", "filename": "cv", "cloud_url": None, "extracted_text": text,
+              "structured_content": content, "job_id": None, "job_title": None}
+        cvs.append({**cv, "id": storage.add_cv(cv)})
+    start = time.perf_counter()
+    chunk_vectors = get_cv_chunk_vectors(cvs)
+    results["chunk_and_embed_cvs"] = summarize([time.perf_counter() - start], items=len(cvs))
+    job_embedding = embed_texts([job_text])[0]
+    start = time.perf_counter()
+    score_cv_chunks(job_embedding, [chunk_vectors[cv["id"]] for cv in cvs])
+    results["score_cv_chunks_all"] = summarize([time.perf_counter() - start], items=len(cvs))
+    start = time.perf_counter()
+    score_cvs(job, job_embedding, cvs)
+    results["score_cvs_hybrid_all"] = summarize([time.perf_counter() - start], items=len(cvs))
+    start = time.perf_counter()
+    lexical_scores(job, cvs)
+    results["lexical_scores_all"] = summarize([time.perf_counter() - start], items=len(cvs))
+
+    latencies, _ = timed(lambda cv: generate_feedback(job, cv, 50.0), cvs)
+    results["generate_feedback"] = summarize(latencies)
+
+def bench_api(files, jobs, results):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils import cache
+
+    # Entering the client runs the startup hooks (model warm-up, index sync) like a real server
+    with TestClient(app) as client:
+        def login(username, role):
+            client.post("/register", json={"username": username, "password": "bench", "role": role})
+            token = client.post("/login", data={"username": username, "password": "bench"}).json()["access_token"]
+            return {"Authorization": f"Bearer {token}"}
+        admin = login("bench_admin", "admin")
+        seeker = login("bench_seeker", "job_seeker")
+
+        # One job per uploaded CV, so every (seeker, job) pair has exactly one CV to evaluate
+        for job in jobs:
+            client.post("/api/job-description", json=job, headers=admin)
+        job_ids = [job["id"] for job in client.get("/api/job-descriptions", headers=admin).json()][-len(jobs):]
+
+        accept_latencies, ingestion_ids = [], []
+        for (filename, content, _), job_id in zip(files, job_ids):
+            start = time.perf_counter()
+            response = client.post("/api/upload-cv", files={"file": (filename, content)}, data={"job_id": str(job_id)}, headers=seeker)
+            accept_latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            ingestion_ids.append(response.json()["ingestion_id"])
+        results["api_upload_cv_accept"] = summarize(accept_latencies)
+
+        completion_latencies = []
+        failed = 0
+        for ingestion_id in ingestion_ids:
+            while True:
+                status = client.get(f"/api/ingestions/{ingestion_id}", headers=seeker).json()
+                if status["status"] in ("completed", "failed"):
+                    break
+                time.sleep(0.01)
+            failed += status["status"] == "failed"
+            created = datetime.fromisoformat(status["created_at"])
+            updated = datetime.fromisoformat(status["updated_at"])
+            completion_latencies.append((updated - created).total_seconds())
+        results["api_upload_cv_complete"] = {**summarize(completion_latencies), "failed": failed}
+
+        def evaluate(job_id):
+            client.post("/api/evaluate-cv", json={"username": "bench_seeker", "job_id": job_id}, headers=admin).raise_for_status()
+        def evaluate_cold(job_id):
+            cache.evaluation_cache.pop_where(lambda entry: True)
+            cache.job_embedding_cache.pop_where(lambda entry: True)
+            evaluate(job_id)
+        latencies, _ = timed(evaluate_cold, job_ids)
+        results["api_evaluate_cv_cold"] = summarize(latencies)
+        latencies, _ = timed(evaluate, job_ids)
+        results["api_evaluate_cv_cached"] = summarize(latencies)
+
+def compare(current, baseline, tolerance):
+    print(f"{'stage':32} {'throughput':>12} {'p50':>10} {'p99':>10}")
+    regressions = []
+    for stage, stats in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before or not before.get("throughput_per_s") or not stats.get("throughput_per_s"):
+            continue
+        throughput = stats["throughput_per_s"] / before["throughput_per_s"] - 1
+        p50 = stats["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        p99 = stats["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        print(f"{stage:32} {throughput:>+11.1%} {p50:>+9.1%} {p99:>+9.1%}")
+        if throughput < -tolerance or p99 > tolerance:
+            regressions.append(stage)
+    if regressions:
+        print(f"Regressions beyond {tolerance:.0%}: {', '.join(regressions)}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cvs", type=int, default=100, help="synthetic CVs for the stage benchmarks")
+    parser.add_argument("--api-cvs", type=int, default=25, help="CVs pushed through the HTTP round-trips")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # The app keeps its database, indexes and vector files in the working directory
+    workdir = tempfile.mkdtemp(prefix="cvalign-bench-")
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["OBJECT_STORAGE_BACKEND"] = "local"
+    os.environ["OBJECT_STORAGE_DIR"] = os.path.join(workdir, "uploads")
+
+    from app.utils.embeddings import model_id
+
+    files = list(generate_cv_files(args.cvs, seed=args.seed))
+    rng = random.Random(args.seed)
+    jobs = [generate_job(rng) for _ in range(max(1, args.api_cvs))]
+
+    results = {}
+    bench_stages(files, jobs, results)
+    if args.api_cvs:
+        bench_api(files[:args.api_cvs], jobs, results)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_id": model_id(),
+        "cvs": args.cvs,
+        "api_cvs": args.api_cvs,
+        "stages": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    from app.main import save_vector_indexes
+    import asyncio
+    asyncio.run(save_vector_indexes())
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
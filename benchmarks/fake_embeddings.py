@@ -0,0 +1,51 @@
+"""Deterministic stand-in for app/embedding_server.py, so the API runs offline without downloading a model.
+
+Words are hashed into EMBEDDING_DIM signed buckets, so identical texts always get identical vectors
+and texts sharing words stay similar. Point the API at it with EMBEDDING_BACKEND=remote:
+
+    uvicorn benchmarks.fake_embeddings:app --port 8001
+    EMBEDDING_BACKEND=remote EMBEDDING_SERVER_URL=http://127.0.0.1:8001 uvicorn app.main:app
+"""
+import hashlib
+import os
+import re
+import time
+import numpy as np
+from fastapi import FastAPI
+from pydantic import BaseModel
+from app.utils.embeddings import EMBEDDING_DIM, encode_vectors
+
+# Simulated model time per text, to approximate the cost of a real model on the target hardware
+FAKE_EMBEDDING_DELAY = float(os.getenv("FAKE_EMBEDDING_DELAY", "0"))
+WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+app = FastAPI()
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+
+def _bucket(word):
+    value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return value % EMBEDDING_DIM, 1.0 if value >> 63 else -1.0
+
+def fake_embed(texts):
+    matrix = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in WORD_PATTERN.findall(text.lower()):
+            column, sign = _bucket(word)
+            matrix[row, column] += sign
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+@app.get("/info")
+async def info():
+    return {"model_id": f"fake-hashing-{EMBEDDING_DIM}"}
+
+@app.post("/embed")
+def embed(request: EmbedRequest):
+    if FAKE_EMBEDDING_DELAY:
+        time.sleep(FAKE_EMBEDDING_DELAY * len(request.texts))
+    if not request.texts:
+        return encode_vectors(np.zeros((0, 0), dtype=np.float32))
+    return encode_vectors(fake_embed(request.texts))
@@ -0,0 +1,344 @@
+"""Offline load test of the API under uvicorn with a mixed login/upload/evaluate/list workload.
+
+Starts the deterministic fake embedding server (benchmarks/fake_embeddings.py) and the API with the
+local object storage backend against a throwaway database, seeds users, jobs and CVs through the API,
+then runs --users concurrent virtual users for --duration seconds. Throughput, p50/p95/p99 latency and
+error rates are reported per endpoint and written as JSON:
+
+    python -m benchmarks.load_test --users 500 --duration 60 --output load.json
+
+Use --base-url to load an API that is already running (it must accept registrations). The client runs
+in a single process; compare its CPU use against the server's before blaming the server for a plateau.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_pipeline import git_commit, percentile
+from benchmarks.synthetic import generate_cv_files, generate_job
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "load-test"
+DEFAULT_MIX = "login=10,upload=10,evaluate=30,list_jobs=15,list_cvs=15,list_evaluations=20"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(app_path, port, env, workdir, log_name, workers=1):
+    log_path = os.path.join(workdir, log_name)
+    log = open(log_path, "wb")
+    command = [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT), log, log_path
+
+def wait_until_up(url, process, log_path, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            httpx.get(url, timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    with open(log_path, errors="replace") as f:
+        raise RuntimeError(f"{url} did not come up:\n{f.read()[-2000:]}")
+
+def stop_server(process, log, log_path):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    log.close()
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; use {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def summarize(latencies, outcomes, duration):
+    """Outcomes count responses by status code, and failed requests by exception name; anything but 2xx is an error."""
+    ordered = sorted(latencies)
+    errors = sum(count for outcome, count in outcomes.items() if not outcome.startswith("2"))
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4),
+        "throughput_per_s": round(len(ordered) / duration, 3),
+        "p50_ms": round(1000 * percentile(ordered, 0.50), 3),
+        "p95_ms": round(1000 * percentile(ordered, 0.95), 3),
+        "p99_ms": round(1000 * percentile(ordered, 0.99), 3),
+        "max_ms": round(1000 * ordered[-1], 3),
+        "outcomes": dict(sorted(outcomes.items())),
+    }
+
+class Recorder:
+    """Latency and outcome of every request, by endpoint name."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.outcomes = {}
+
+    def record(self, name, seconds, outcome):
+        self.latencies.setdefault(name, []).append(seconds)
+        outcomes = self.outcomes.setdefault(name, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def report(self, duration):
+        """Returns ({endpoint: stats}, stats over all requests), or None for the latter if nothing completed."""
+        endpoints = {name: summarize(self.latencies[name], self.outcomes[name], duration) for name in sorted(self.latencies)}
+        if not endpoints:
+            return endpoints, None
+        outcomes = {}
+        for counts in self.outcomes.values():
+            for outcome, count in counts.items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+        return endpoints, summarize([seconds for latencies in self.latencies.values() for seconds in latencies], outcomes, duration)
+
+async def timed_request(recorder, name, client, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        recorder.record(name, time.perf_counter() - start, type(e).__name__)
+        return None
+    recorder.record(name, time.perf_counter() - start, str(response.status_code))
+    return response
+
+# Seeded data
+
+async def register(client, username, role):
+    response = await client.post("/register", json={"username": username, "password": PASSWORD, "role": role})
+    if response.status_code not in (200, 400):  # 400: already registered by an earlier run
+        response.raise_for_status()
+    response = await client.post("/login", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def gather_limited(coroutines, limit=16):
+    semaphore = asyncio.Semaphore(limit)
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+async def upload_and_wait(client, headers, file, job_id):
+    filename, content, _ = file
+    response = await client.post("/api/upload-cv", files={"file": (filename, content)}, data={"job_id": str(job_id)}, headers=headers)
+    response.raise_for_status()
+    ingestion_id = response.json()["ingestion_id"]
+    while True:
+        status = (await client.get(f"/api/ingestions/{ingestion_id}", headers=headers)).json()
+        if status["status"] in ("completed", "failed"):
+            return status["status"]
+        await asyncio.sleep(0.05)
+
+async def seed(client, rng, args, files):
+    """Register an admin, one recruiter per job, the job seekers, and upload one CV per seeker."""
+    prefix = f"load{args.seed}"
+    admin = await register(client, f"{prefix}_admin", "admin")
+    recruiter_names = [f"{prefix}_recruiter{i}" for i in range(args.jobs)]
+    recruiters = await gather_limited(register(client, name, "recruiter") for name in recruiter_names)
+    for name, headers in zip(recruiter_names, recruiters):
+        response = await client.post("/api/job-description", json=generate_job(rng, created_by=name), headers=headers)
+        if response.status_code != 400:  # 400: this recruiter's job exists from an earlier run
+            response.raise_for_status()
+    jobs = {job["created_by"]: job["id"] for job in (await client.get("/api/job-descriptions", headers=admin)).json()}
+    job_ids = [jobs[name] for name in recruiter_names]
+
+    seeker_names = [f"{prefix}_seeker{i}" for i in range(args.seekers)]
+    seekers = await gather_limited(register(client, name, "job_seeker") for name in seeker_names)
+    # Seeker i applies to job i % jobs, so every recruiter has candidates to evaluate
+    applications = [(name, headers, i % args.jobs) for i, (name, headers) in enumerate(zip(seeker_names, seekers))]
+    results = await gather_limited(
+        upload_and_wait(client, headers, files[i % len(files)], job_ids[job])
+        for i, (_, headers, job) in enumerate(applications)
+    )
+    if results.count("failed"):
+        print(f"{results.count('failed')} seeded CVs failed to ingest")
+    return {
+        "seekers": [(name, headers, job_ids[job], recruiters[job]) for name, headers, job in applications],
+        "recruiters": recruiters,
+        "files": files,
+    }
+
+# Workload
+
+async def op_login(client, recorder, rng, data):
+    name, _, _, _ = rng.choice(data["seekers"])
+    await timed_request(recorder, "login", client, "POST", "/login", data={"username": name, "password": PASSWORD})
+
+async def op_upload(client, recorder, rng, data):
+    _, headers, job_id, _ = rng.choice(data["seekers"])
+    filename, content, _ = rng.choice(data["files"])
+    await timed_request(recorder, "upload", client, "POST", "/api/upload-cv", headers=headers,
+                        files={"file": (filename, content)}, data={"job_id": str(job_id)})
+
+async def op_evaluate(client, recorder, rng, data):
+    name, _, job_id, recruiter = rng.choice(data["seekers"])
+    await timed_request(recorder, "evaluate", client, "POST", "/api/evaluate-cv", headers=recruiter,
+                        json={"username": name, "job_id": job_id})
+
+async def op_list_jobs(client, recorder, rng, data):
+    _, headers, _, _ = rng.choice(data["seekers"])
+    await timed_request(recorder, "list_jobs", client, "GET", "/api/job-descriptions", headers=headers)
+
+async def op_list_cvs(client, recorder, rng, data):
+    await timed_request(recorder, "list_cvs", client, "GET", "/api/cvs", headers=rng.choice(data["recruiters"]),
+                        params={"limit": 50, "fields": "id,username,filename,job_id"})
+
+async def op_list_evaluations(client, recorder, rng, data):
+    await timed_request(recorder, "list_evaluations", client, "GET", "/api/evaluations", headers=rng.choice(data["recruiters"]),
+                        params={"limit": 50, "sort": "relevance_score"})
+
+OPERATIONS = {
+    "login": op_login,
+    "upload": op_upload,
+    "evaluate": op_evaluate,
+    "list_jobs": op_list_jobs,
+    "list_cvs": op_list_cvs,
+    "list_evaluations": op_list_evaluations,
+}
+
+async def virtual_user(index, client, recorder, data, args, mix, deadline):
+    rng = random.Random(args.seed * 100003 + index)
+    names, weights = list(mix), list(mix.values())
+    # Users start spread over the ramp-up so the first second isn't one burst of connections
+    await asyncio.sleep(args.ramp_up * index / args.users)
+    while time.monotonic() < deadline:
+        await OPERATIONS[rng.choices(names, weights)[0]](client, recorder, rng, data)
+        if args.think_time:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+async def run(base_url, args, mix):
+    rng = random.Random(args.seed)
+    files = list(generate_cv_files(args.cv_files, seed=args.seed))
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"Seeding {args.jobs} jobs and {args.seekers} job seekers with CVs...")
+        start = time.perf_counter()
+        data = await seed(client, rng, args, files)
+        seed_seconds = time.perf_counter() - start
+
+        print(f"Running {args.users} virtual users for {args.duration:g}s...")
+        recorder = Recorder()
+        start = time.monotonic()
+        deadline = start + args.ramp_up + args.duration
+        await asyncio.gather(*(virtual_user(i, client, recorder, data, args, mix, deadline) for i in range(args.users)))
+        duration = time.monotonic() - start
+    return recorder, duration, seed_seconds
+
+def print_report(endpoints, total):
+    print(f"{'endpoint':18} {'requests':>9} {'req/s':>9} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in list(endpoints.items()) + [("total", total)]:
+        print(f"{name:18} {stats['requests']:>9} {stats['throughput_per_s']:>9.1f} {stats['error_rate']:>8.2%} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after the ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which virtual users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean pause between a user's requests, in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--jobs", type=int, default=20, help="seeded jobs, one recruiter each")
+    parser.add_argument("--seekers", type=int, default=200, help="seeded job seekers, one CV each")
+    parser.add_argument("--cv-files", type=int, default=50, help="distinct synthetic CV files used for uploads")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--embedding-delay", type=float, default=0.0, help="simulated model seconds per embedded text")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout per request, in seconds")
+    parser.add_argument("--base-url", help="load this running API instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--max-error-rate", type=float, help="exit with status 1 if the overall error rate is higher")
+    parser.add_argument("--max-p99-ms", type=float, help="exit with status 1 if any endpoint's p99 is higher")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    workdir = None
+    servers = []
+    base_url = args.base_url
+    try:
+        if base_url is None:
+            # The app keeps its database, indexes and vector files in the working directory
+            workdir = tempfile.mkdtemp(prefix="cvalign-load-")
+            embedding_port, api_port = free_port(), free_port()
+            env = {
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+                "FAKE_EMBEDDING_DELAY": str(args.embedding_delay),
+            }
+            servers.append(start_server("benchmarks.fake_embeddings:app", embedding_port, env, workdir, "embeddings.log"))
+            wait_until_up(f"http://127.0.0.1:{embedding_port}/info", *servers[-1][::2])
+
+            env.update({
+                "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+                "OBJECT_STORAGE_BACKEND": "local",
+                "OBJECT_STORAGE_DIR": os.path.join(workdir, "uploads"),
+                "EMBEDDING_BACKEND": "remote",
+                "EMBEDDING_SERVER_URL": f"http://127.0.0.1:{embedding_port}",
+                # Nothing in the workload edits jobs, and several workers must not all run the scheduler
+                "RESCORE_ENABLED": "0",
+            })
+            servers.append(start_server("app.main:app", api_port, env, workdir, "api.log", args.workers))
+            base_url = f"http://127.0.0.1:{api_port}"
+            wait_until_up(f"{base_url}/", *servers[-1][::2])
+
+        recorder, duration, seed_seconds = asyncio.run(run(base_url, args, args.mix))
+    finally:
+        for server in reversed(servers):
+            stop_server(*server)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    endpoints, total = recorder.report(duration)
+    if total is None:
+        sys.exit("No requests completed")
+    print_report(endpoints, total)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "max_error_rate", "max_p99_ms")},
+        "seed_seconds": round(seed_seconds, 3),
+        "duration_s": round(duration, 3),
+        "endpoints": endpoints,
+        "total": total,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    failures = []
+    if args.max_error_rate is not None and total["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {total['error_rate']:.2%} above {args.max_error_rate:.2%}")
+    if args.max_p99_ms is not None:
+        failures += [f"{name} p99 {stats['p99_ms']:.0f} ms above {args.max_p99_ms:.0f} ms"
+                     for name, stats in endpoints.items() if stats["p99_ms"] > args.max_p99_ms]
+    if failures:
+        print("Failed: " + "; ".join(failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import io
+import random
+from docx import Document
+
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Ishaan", "Sneha"]
+LAST_NAMES = ["Sharma", "Iyer", "Patel", "Reddy", "Gupta", "Nair", "Singh", "Das", "Menon", "Joshi"]
+UNIVERSITIES = ["IIT Bombay", "IIT Delhi", "NIT Trichy", "BITS Pilani", "IIIT Hyderabad", "Anna University"]
+DEGREES = ["B.Tech in Computer Science", "M.Tech in Data Science", "B.Tech in Electronics", "PhD in Machine Learning"]
+COMPANIES = ["Infosys", "Flipkart", "Razorpay", "Zomato", "TCS", "Swiggy", "Freshworks", "Zoho"]
+ROLES = ["Software Engineer", "Backend Developer", "Data Scientist", "ML Engineer", "Full Stack Developer"]
+SKILLS = [
+    "python", "java", "javascript", "sql", "react", "fastapi", "django", "docker", "kubernetes", "aws",
+    "pytorch", "tensorflow", "pandas", "numpy", "git", "linux", "redis", "postgresql", "leadership", "teamwork",
+]
+DUTIES = [
+    "Built REST APIs serving {n}k requests per day",
+    "Reduced p99 latency of the search service by {n}%",
+    "Designed a data pipeline processing {n} GB of logs daily",
+    "Mentored {n} junior engineers and led code reviews",
+    "Migrated {n} services to Kubernetes with zero downtime",
+    "Trained ranking models that improved click-through by {n}%",
+]
+
+def generate_cv_text(rng, experience_entries=3):
+    """A plain-text CV laid out with the section headers structure_cv_content looks for."""
+    lines = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "Summary", "Engineer who enjoys building reliable systems."]
+    lines += ["Education", f"{rng.choice(DEGREES)}, {rng.choice(UNIVERSITIES)}, {rng.randint(2012, 2023)}"]
+    lines.append("Experience")
+    for _ in range(experience_entries):
+        lines.append(f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)} ({rng.randint(1, 6)} years)")
+        lines += [rng.choice(DUTIES).format(n=rng.randint(2, 90)) for _ in range(3)]
+    lines += ["Technical Skills", "• " + ", ".join(rng.sample(SKILLS, 8))]
+    lines += ["Positions of Responsibility", f"Coordinator, {rng.choice(['Coding', 'Robotics', 'Music'])} Club"]
+    lines += ["Achievements", f"Ranked {rng.randint(1, 500)} in a national coding contest"]
+    return "\n".join(lines)
+
+def generate_job(rng, created_by="bench_recruiter"):
+    return {
+        "jobTitle": rng.choice(ROLES),
+        "skills": ", ".join(rng.sample(SKILLS, 5)),
+        "experience": f"{rng.randint(1, 5)} years of backend development",
+        "traits": rng.choice(["Ownership, curiosity", "Strong communication", None]),
+        "created_by": created_by,
+    }
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace").decode("latin-1")
+
+def make_pdf(text, lines_per_page=45):
+    """A minimal text-only PDF (Helvetica, one line per text row) that PyPDF2 can extract."""
+    lines = text.split("\n")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        stream = "BT /F1 10 Tf 50 770 Td 14 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in page_lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    out.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+def make_docx(text):
+    document = Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+def generate_cv_files(count, seed=0):
+    """Yield (filename, bytes, text) for alternating PDF and DOCX CVs."""
+    rng = random.Random(seed)
+    for i in range(count):
+        text = generate_cv_text(rng, experience_entries=rng.randint(1, 6))
+        if i % 2:
+            yield f"cv_{i}.docx", make_docx(text), text
+        else:
+            yield f"cv_{i}.pdf", make_pdf(text), text
@@ -12,13 +12,24 @@ const Dashboard = ({ token, onLogout }) => {
   // Decode token to get role
   const role = token ? JSON.parse(atob(token.split('.')[1])).role : '';
 
+  // Listing endpoints are paginated; follow X-Next-Cursor until the last page
+  const fetchAllPages = async (url, params) => {
+    const config = {
+      headers: { Authorization: `Bearer ${token}` }
+    };
+    let items = [];
+    let cursor = null;
+    do {
+      const response = await axios.get(url, { ...config, params: { ...params, limit: 500, cursor: cursor || undefined } });
+      items = items.concat(response.data);
+      cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+  };
+
   const fetchEvaluations = async () => {
     try {
-      const config = {
-        headers: { Authorization: `Bearer ${token}` }
-      };
-      const response = await axios.get('http://127.0.0.1:8000/api/evaluations', config);
-      setEvaluations(response.data);
+      setEvaluations(await fetchAllPages('http://127.0.0.1:8000/api/evaluations', {}));
     } catch (error) {
       console.error('Error fetching evaluations:', error);
       setMessage(error.response?.data?.detail || 'Error fetching evaluations.');
@@ -27,11 +38,9 @@ const Dashboard = ({ token, onLogout }) => {
 
   const fetchCvs = async () => {
     try {
-      const config = {
-        headers: { Authorization: `Bearer ${token}` }
-      };
-      const response = await axios.get('http://127.0.0.1:8000/api/cvs', config);
-      setCvs(response.data);
+      // The raw extracted text is not shown, so leave it out of the payload
+      const fields = 'id,username,filename,cloud_url,structured_content,job_id,job_title';
+      setCvs(await fetchAllPages('http://127.0.0.1:8000/api/cvs', { fields }));
     } catch (error) {
       console.error('Error fetching CVs:', error);
       setMessage(error.response?.data?.detail || 'Error fetching CVs.');
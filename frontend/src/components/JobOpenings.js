@@ -61,7 +61,7 @@ function JobOpenings({ token, onLogout }) {
         'Content-Type': 'multipart/form-data',
       },
     });
-    setMessage('Application submitted successfully! Cloud URL: ' + response.data.cloud_url);
+    setMessage('Application received! Your CV is being processed (reference: ' + response.data.ingestion_id + ').');
     setFile(null);
     document.querySelector('input[type="file"]').value = null;
   } catch (error) {